@@ -0,0 +1,191 @@
+# asr/backends.py
+from __future__ import annotations
+import os
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+import numpy as np
+import torch
+from transformers import WhisperProcessor, WhisperForConditionalGeneration
+
+from asr import precision as prec
+from asr.decoder import decode_words, transcribe, transcribe_batch
+from asr.features import IncrementalLogMel
+from asr.streaming import Word
+
+# "transformers" (HF Whisper, asr.decoder) or "faster-whisper" (CTranslate2). Unset = caller's default.
+ENGINES = ("transformers", "faster-whisper")
+ENGINE = os.environ.get("ASR_ENGINE")
+
+# CTranslate2 compute types matching asr.precision modes
+_CT2_COMPUTE = {"fp32": "float32", "bf16": "bfloat16", "int8": "int8"}
+# rough CTranslate2 weight sizes (fp32 MB) for the registry's memory budget
+_CT2_SIZE_MB = {"tiny": 150, "base": 290, "small": 970, "medium": 3060, "large": 6200}
+
+def load_whisper(repo: str, precision: Optional[str] = None,
+                 device: torch.device = torch.device("cpu")):
+    """
+    Load a Whisper checkpoint in one of asr.precision.PRECISIONS and apply the
+    generation-config fixes the GUI relies on. bf16/int8 conversions are cached on disk.
+    """
+    precision = prec.check_precision(precision)
+    processor = WhisperProcessor.from_pretrained(repo)
+    model = prec.load_cached(repo, precision)
+    if model is None:
+        model = WhisperForConditionalGeneration.from_pretrained(
+            repo, torch_dtype=torch.float32
+        )
+        model = prec.convert(model, precision)
+        try:
+            prec.save_cached(model, repo, precision)
+        except Exception as e:
+            print(f"[asr] could not cache {precision} weights for {repo}: {e}")
+    model = model.to(device)
+    model.eval()
+
+    # silence HF warning about do_sample/temperature
+    try:
+        gc = model.generation_config
+        if hasattr(gc, "temperature"):
+            gc.temperature = None
+        if hasattr(gc, "do_sample"):
+            gc.do_sample = False
+    except Exception:
+        pass
+
+    try:
+        if getattr(model.generation_config, "forced_decoder_ids", None) is not None:
+            model.generation_config.forced_decoder_ids = None
+    except Exception: pass
+    return processor, model
+
+def model_nbytes(model: torch.nn.Module) -> int:
+    # state_dict rather than parameters(): int8 Linear weights live in packed params
+    n = 0
+    for v in model.state_dict().values():
+        for t in (v if isinstance(v, tuple) else (v,)):
+            if torch.is_tensor(t):
+                n += t.numel() * t.element_size()
+    return n
+
+def _lang_or_none(lang: Optional[str]) -> Optional[str]:
+    lang = (lang or "auto").lower()
+    return None if lang == "auto" else lang
+
+class ASRBackend(ABC):
+    """
+    One speech-to-text engine. Audio is always 16 kHz mono float32; lang is
+    "en", "ar" or "auto".
+    """
+    engine = "base"
+
+    @abstractmethod
+    def transcribe(self, audio16: np.ndarray, lang: str = "auto", input_features=None) -> str:
+        """input_features come from this backend's frontend(); engines without one ignore them."""
+
+    def transcribe_batch(self, clips: List[np.ndarray], lang: str = "auto", batch_size: int = 8) -> List[str]:
+        """transcribe() for many clips; engines that can batch override this."""
+        return [self.transcribe(c, lang) for c in clips]
+
+    def transcribe_words(self, audio16: np.ndarray, lang: str = "auto") -> List[Word]:
+        """(word, end_sec) pairs for streaming; end_sec is None when the engine can't time words."""
+        return [(w, None) for w in self.transcribe(audio16, lang).split()]
+
+    def frontend(self) -> Optional[IncrementalLogMel]:
+        """A fresh incremental feature extractor to feed during capture, or None."""
+        return None
+
+    def nbytes(self) -> int:
+        return 0
+
+class TransformersWhisper(ASRBackend):
+    engine = "transformers"
+
+    def __init__(self, processor, model, device=torch.device("cpu"), decode_mode: Optional[str] = None,
+                 encoder_mode: Optional[str] = None, assistant=None):
+        self.processor = processor
+        self.model = model
+        self.device = device
+        self.decode_mode = decode_mode
+        self.encoder_mode = encoder_mode
+        self.assistant = assistant  # draft model for speculative decoding, same tokenizer
+
+    @staticmethod
+    def _repo(name: str) -> str:
+        return name if "/" in name else f"openai/whisper-{name}"
+
+    @classmethod
+    def load(cls, repo: str, precision: Optional[str] = None, draft: Optional[str] = None,
+             **kw) -> "TransformersWhisper":
+        processor, model = load_whisper(cls._repo(repo), precision)
+        if draft:
+            kw["assistant"] = load_whisper(cls._repo(draft), precision)[1]
+        return cls(processor, model, **kw)
+
+    def with_draft(self, draft: "TransformersWhisper") -> "TransformersWhisper":
+        """This model decoding with draft's model as its speculative assistant; no weights are copied."""
+        return TransformersWhisper(self.processor, self.model, self.device, self.decode_mode,
+                                   self.encoder_mode, assistant=draft.model)
+
+    def transcribe(self, audio16, lang="auto", input_features=None):
+        return transcribe(self.processor, self.model, audio16, lang, self.device, self.decode_mode,
+                          input_features, self.encoder_mode, self.assistant)
+
+    def transcribe_batch(self, clips, lang="auto", batch_size=8):
+        return transcribe_batch(self.processor, self.model, clips, lang, self.device, self.decode_mode,
+                                self.encoder_mode, batch_size)
+
+    def transcribe_words(self, audio16, lang="auto"):
+        return decode_words(self.processor, self.model, audio16, lang, self.device, self.decode_mode,
+                            self.encoder_mode, self.assistant)
+
+    def frontend(self):
+        return IncrementalLogMel.from_processor(self.processor)
+
+    def nbytes(self):
+        return model_nbytes(self.model) + (model_nbytes(self.assistant) if self.assistant is not None else 0)
+
+class FasterWhisper(ASRBackend):
+    engine = "faster-whisper"
+
+    def __init__(self, model_size_or_path: str = "small", precision: Optional[str] = "int8",
+                 device: str = "cpu", **transcribe_kw):
+        from faster_whisper import WhisperModel
+        if model_size_or_path.startswith("openai/whisper-"):
+            model_size_or_path = model_size_or_path.split("whisper-", 1)[1]
+        self.name = model_size_or_path
+        self.precision = prec.check_precision(precision)
+        self.model = WhisperModel(model_size_or_path, device=device,
+                                  compute_type=_CT2_COMPUTE[self.precision])
+        self.transcribe_kw = transcribe_kw
+
+    @classmethod
+    def load(cls, name: str, precision: Optional[str] = None, **kw) -> "FasterWhisper":
+        return cls(name, precision, **kw)
+
+    def transcribe(self, audio16, lang="auto", input_features=None):
+        segments, _ = self.model.transcribe(audio16, language=_lang_or_none(lang), **self.transcribe_kw)
+        return " ".join(s.text for s in segments).strip()
+
+    def transcribe_words(self, audio16, lang="auto"):
+        segments, _ = self.model.transcribe(audio16, language=_lang_or_none(lang),
+                                            word_timestamps=True, **self.transcribe_kw)
+        return [(w.word.strip(), float(w.end)) for s in segments for w in (s.words or []) if w.word.strip()]
+
+    def nbytes(self):
+        mb = _CT2_SIZE_MB.get(self.name.split(".")[0], 1000)
+        return int(mb * 2**20 / (4 if self.precision == "int8" else 2 if self.precision == "bf16" else 1))
+
+def load_backend(engine: Optional[str], model: str, precision: Optional[str] = None, **kw) -> ASRBackend:
+    """
+    Build an ASRBackend; engine=None uses $ASR_ENGINE, then "transformers".
+    "main+draft" (e.g. "openai/whisper-medium+openai/whisper-small") decodes `main` with
+    `draft` as its speculative assistant; faster-whisper has no draft mode and uses `main` alone.
+    """
+    engine = (engine or ENGINE or "transformers").lower()
+    model, _, draft = model.partition("+")
+    if engine == "transformers":
+        return TransformersWhisper.load(model, precision, draft=draft or None, **kw)
+    if engine == "faster-whisper":
+        return FasterWhisper.load(model, precision, **kw)
+    raise ValueError(f"engine must be one of {ENGINES}, got {engine!r}")
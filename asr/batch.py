@@ -0,0 +1,107 @@
+# asr/batch.py
+"""
+Transcribe a directory of WAV files to JSONL, several clips per generate() call.
+
+    python -m asr.batch recordings/ -o transcripts.jsonl
+    python -m asr.batch sessions/ -o out.jsonl --model ychafiqui/whisper-medium-darija --precision int8 --batch-size 16
+
+One line per file: {"file", "seconds", "text"}. Files are read in sorted order,
+silence is trimmed with the same VAD as the GUI (--no-vad to keep it), and
+--append skips files already present in the output, so an interrupted overnight
+run picks up where it stopped.
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import time
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import torch
+from transformers.utils import logging as hf_logging
+
+from asr.backends import ASRBackend, ENGINES, load_backend
+from asr.precision import PRECISIONS
+from utils.vad import trim_silence
+from utils.wavfile import read_wav
+
+hf_logging.set_verbosity_error()
+
+# Clips read ahead of the model; sorting by length only happens inside this window
+CHUNK_FILES = 64
+
+def wav_files(root: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(root, "**", "*.wav"), recursive=True))
+
+def transcribe_files(backend: ASRBackend, paths: Iterable[str], lang: str = "auto",
+                     batch_size: int = 8, vad: bool = True,
+                     chunk: int = CHUNK_FILES) -> Iterator[dict]:
+    """Yield one record per path, in order, decoding `chunk` files at a time in length-sorted batches."""
+    paths = list(paths)
+    for c in range(0, len(paths), chunk):
+        loaded: List[Tuple[str, float, np.ndarray]] = []
+        for path in paths[c:c + chunk]:
+            audio = read_wav(path)
+            loaded.append((path, len(audio) / 16000, trim_silence(audio) if vad else audio))
+        voiced = [i for i, (_, _, a) in enumerate(loaded) if len(a)]
+        texts = backend.transcribe_batch([loaded[i][2] for i in voiced], lang, batch_size)
+        by_index = dict(zip(voiced, texts))
+        for i, (path, seconds, _) in enumerate(loaded):
+            yield {"file": path, "seconds": round(seconds, 3), "text": by_index.get(i, "")}
+
+def _done(out_path: str) -> set:
+    done = set()
+    if os.path.exists(out_path):
+        with open(out_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    done.add(json.loads(line)["file"])
+                except (ValueError, KeyError):
+                    pass
+    return done
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    ap.add_argument("audio_dir")
+    ap.add_argument("-o", "--out", required=True, help="JSONL output path")
+    ap.add_argument("--engine", choices=ENGINES, default=None)
+    ap.add_argument("--model", default="ychafiqui/whisper-small-darija")
+    ap.add_argument("--precision", choices=PRECISIONS, default=None)
+    ap.add_argument("--lang", default="ar", help='"ar", "en" or "auto"')
+    ap.add_argument("--batch-size", type=int, default=8)
+    ap.add_argument("--no-vad", action="store_true", help="decode the files as-is")
+    ap.add_argument("--append", action="store_true", help="keep existing output and skip files already in it")
+    ap.add_argument("--threads", type=int, default=0, help="torch CPU threads (0 = torch default)")
+    args = ap.parse_args(argv)
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    paths = wav_files(args.audio_dir)
+    done = _done(args.out) if args.append else set()
+    paths = [p for p in paths if p not in done]
+    if not paths:
+        print(f"[batch] nothing to do in {args.audio_dir}")
+        return
+
+    backend = load_backend(args.engine, args.model, args.precision)
+    print(f"[batch] {len(paths)} files, {args.model} ({backend.engine}), batch {args.batch_size}, "
+          f"cpu threads={torch.get_num_threads()}")
+
+    t0 = time.perf_counter()
+    audio_sec = 0.0
+    with open(args.out, "a" if args.append else "w", encoding="utf-8") as f:
+        for n, rec in enumerate(transcribe_files(backend, paths, args.lang, args.batch_size,
+                                                 vad=not args.no_vad), 1):
+            f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            audio_sec += rec["seconds"]
+            if n % CHUNK_FILES == 0 or n == len(paths):
+                f.flush()
+                dt = time.perf_counter() - t0
+                print(f"[batch] {n}/{len(paths)} files, {audio_sec / max(dt, 1e-9):.1f}x realtime")
+
+if __name__ == "__main__":
+    main()
@@ -1,66 +1,148 @@
 # asr/decoder.py
+import os
 import time
+import zlib
 import numpy as np
 import torch
-import torch.nn.functional as F
+from transformers.modeling_outputs import BaseModelOutput
 
-def run_decode(window, fs, processor, model, inbuf, emit_text, emit_finalize, device,
-               emit_progress=None, forced_lang: str = "auto"):
+from asr.precision import autocast_for
+from asr.resample import PolyphaseResampler
+from asr.streaming import LocalAgreement
+from utils.ring_buffer import AudioRing
+from utils.vad import VoiceGate
+
+TARGET_SR = 16000
+STREAM_STEP_SEC = 1.0         # decode the rolling window about once per second of new audio
+STREAM_MAX_BUFFER_SEC = 25.0  # Whisper sees at most 30 s; never let the buffer get close
+
+# "cached":   encoder runs once, decoder keeps its self/cross-attention KV cache (linear per token)
+# "uncached": every step re-runs attention over all previous tokens (debug/benchmark baseline)
+DECODE_MODES = ("cached", "uncached")
+DECODE_MODE = os.environ.get("ASR_DECODE_MODE", "cached").lower()
+
+# "full":  every clip is padded to 30 s and the encoder always sees 1500 positions (Whisper default)
+# "short": the encoder only sees the clip plus SHORT_MARGIN_SEC of silence, with the positional
+#          embeddings cut to match; output that looks off is re-decoded with full padding
+ENCODER_MODES = ("full", "short")
+ENCODER_MODE = os.environ.get("ASR_ENCODER_MODE", "full").lower()
+SHORT_MARGIN_SEC = 1.0
+
+# VAD in front of the decoder: silence is trimmed and a hold is split into phrases
+VAD = os.environ.get("ASR_VAD", "on").lower() not in ("0", "off", "false", "no")
+# Stop capturing by itself after this much silence following speech (0 = wait for release)
+AUTO_RELEASE_SEC = float(os.environ.get("ASR_AUTO_RELEASE_SEC", "0"))
+
+# Longest hold kept in memory (mic ring and 16 kHz capture); older audio is overwritten
+MAX_HOLD_SEC = float(os.environ.get("ASR_MAX_HOLD_SEC", "30"))
+
+def _mono(block):
+    x = np.asarray(block, dtype=np.float32)
+    return x if x.ndim == 1 else x[:, 0]
+
+class _Capture:
     """
-    Collect audio while held, then run ONE Whisper decode on release.
-    Supports forced_lang in {"en","ar","auto"} to bias multilingual checkpoints.
+    16 kHz capture buffer: mic blocks are resampled into a reused scratch array and
+    appended to a fixed AudioRing, so a long hold keeps the newest MAX_HOLD_SEC and
+    view() hands out the live region without copying.
     """
-    model.eval()
-    model_dtype = next(model.parameters()).dtype
 
-    target_sr = 16000
-    accum = []
-    sr_in = getattr(window, "mic_sr", fs)
+    def __init__(self, sr_in, seconds=None):
+        self.rs = PolyphaseResampler(sr_in, TARGET_SR)
+        self.ring = AudioRing.for_duration(seconds or MAX_HOLD_SEC, TARGET_SR)
+        self._scratch = np.empty(0, dtype=np.float32)
+        self.total = 0  # samples ever written, so absolute positions survive drop()
 
-    # while holding, drain the queue and store audio
-    while getattr(window, "recording", False):
-        try:
-            block = inbuf.get(timeout=0.05)
-        except Exception:
-            continue
+    def __len__(self):
+        return len(self.ring)
 
-        x = block.astype(np.float32).squeeze()
-        if x.ndim != 1:
-            x = x[:, 0]
+    def write(self, block):
+        """Resample and store one mic block; returns the new 16 kHz samples (valid until the next write)."""
+        x = _mono(block)
+        n = self.rs.max_out(len(x))
+        if n > len(self._scratch):
+            self._scratch = np.empty(max(n, 2 * len(self._scratch)), dtype=np.float32)
+        y = self.rs.process(x, out=self._scratch[:n])
+        self.ring.write(y)
+        self.total += len(y)
+        return y
 
-        if sr_in != target_sr:
-            t = torch.from_numpy(x)[None, None, :].to(torch.float32)
-            t = F.interpolate(t, size=int(len(x) * target_sr / max(1, sr_in)),
-                              mode="linear", align_corners=False)
-            x16 = t[0, 0].cpu().numpy()
-        else:
-            x16 = x
-        accum.append(x16.copy())
+    def pump(self, inbuf, on_audio=None):
+        """
+        Move everything the audio callback has put in `inbuf` (an AudioRing) into the
+        capture, passing the new 16 kHz samples to on_audio.
+        """
+        block = inbuf.read()
+        if len(block):
+            y = self.write(block)
+            if on_audio is not None:
+                on_audio(y)
+        return len(block)
 
-    if emit_progress:
-        try: emit_progress(10)
-        except Exception: pass
+    def drop(self, n):
+        """Forget the oldest n samples of the live region."""
+        self.ring.consume(n)
 
-    if not accum:
-        emit_finalize(time.time())
-        return
+    def view(self):
+        return self.ring.peek()
 
-    audio16 = np.concatenate(accum)
+    def span(self, start, end):
+        """Samples [start, end) by absolute position, clipped to what is still held."""
+        base = self.total - len(self.ring)
+        return self.view()[max(0, start - base):max(0, end - base)]
 
-    # features
-    feats = processor(
-        audio16, sampling_rate=target_sr, return_tensors="pt"
-    ).input_features.to(device=device, dtype=model_dtype)
+class _Phrases:
+    """
+    VAD-split phrases of one hold. Each phrase gets its own incremental log-mel
+    frontend (when the backend has one), started from the pre-roll as soon as the
+    phrase opens and fed every block until the next phrase opens, so release only
+    finishes a few frames each. Feeding through the gaps costs a little feature work
+    but means a phrase the VAD later extends or reopens is still fully covered.
+    Without a gate the whole hold is one phrase.
+    """
 
-    if emit_progress:
-        try: emit_progress(35)
-        except Exception: pass
+    def __init__(self, cap, new_frontend, gate=None):
+        self.cap, self.new_frontend, self.gate = cap, new_frontend, gate
+        self.fronts = []  # [(start, frontend or None)]
+
+    def push(self, y):
+        if self.fronts and self.fronts[-1][1] is not None:
+            self.fronts[-1][1].push(y)
+        opened = self.gate.push(y) if self.gate is not None else ([] if self.fronts else [0])
+        for start in opened:
+            fe = self.new_frontend()
+            if fe is not None:
+                fe.push(self.cap.span(start, self.cap.total))
+            self.fronts.append((start, fe))
+
+    def finish(self):
+        """[(audio16, input_features or None)] per phrase, trimmed to voiced audio."""
+        if self.gate is None:
+            segs = [(0, self.cap.total)] if self.cap.total else []
+        else:
+            segs = self.gate.segments()
+        fronts = dict(self.fronts)
+        out = []
+        for start, end in segs:
+            audio = self.cap.span(start, end)
+            if not len(audio):
+                continue
+            fe = fronts.get(start)
+            # a frontend that didn't see the whole phrase (or a span cut short) is recomputed by the caller
+            whole = fe is not None and len(audio) == end - start and fe.n >= end - start
+            out.append((audio, fe.finish(end - start) if whole else None))
+        return out
+
+def _generation_args(processor, model, forced_lang, decode_mode=None):
+    decode_mode = (decode_mode or DECODE_MODE).lower()
+    if decode_mode not in DECODE_MODES:
+        raise ValueError(f"decode_mode must be one of {DECODE_MODES}, got {decode_mode!r}")
 
-    # generation args
     gen_kwargs = {
         "max_new_tokens": 128,
         "do_sample": False,
-        "return_dict_in_generate": False
+        "return_dict_in_generate": False,
+        "use_cache": decode_mode == "cached",
     }
 
     # If multilingual whisper (small/medium), we can supply language+task prompt IDs
@@ -71,12 +153,11 @@ def run_decode(window, fs, processor, model, inbuf, emit_text, emit_finalize, de
         is_multilingual = True
 
     task = "transcribe"
-    forced_ids = None
     if is_multilingual and forced_lang in ("en", "ar"):
         try:
-            forced_ids = processor.get_decoder_prompt_ids(language=forced_lang, task=task)
+            gen_kwargs["forced_decoder_ids"] = processor.get_decoder_prompt_ids(language=forced_lang, task=task)
         except Exception:
-            forced_ids = None
+            pass
 
     # make sure English checkpoints are not forcing English
     try:
@@ -84,18 +165,349 @@ def run_decode(window, fs, processor, model, inbuf, emit_text, emit_finalize, de
             model.generation_config.forced_decoder_ids = None
     except Exception:
         pass
+    return gen_kwargs
+
+def _features(processor, audio16, device, dtype):
+    return processor(
+        audio16, sampling_rate=TARGET_SR, return_tensors="pt"
+    ).input_features.to(device=device, dtype=dtype)
 
+def _encode(model, feats, use_cache, n_frames=None):
+    """
+    Model inputs for generate(). In cached mode the encoder is run here, once, and its
+    hidden states are handed to generate so every decoder step (and the cross-attention
+    KV cache built from them) reuses the same encoder output.
+    With n_frames, only the first n_frames mel frames are encoded (short-form mode).
+    """
+    if n_frames is not None:
+        return {"encoder_outputs": _short_encoder(model, feats, n_frames)}
+    if not use_cache:
+        return {"input_features": feats}
+    with torch.no_grad():
+        return {"encoder_outputs": model.get_encoder()(feats, return_dict=True)}
+
+def _short_encoder(model, feats, n_frames):
+    """
+    WhisperEncoder.forward on the first n_frames of `feats`: the stock forward insists on
+    3000 frames, so the layers are run here with positional embeddings cut to the same length.
+    """
+    enc = model.get_encoder()
+    stride = enc.conv1.stride[0] * enc.conv2.stride[0]
+    t = min(feats.shape[-1], -(-n_frames // stride) * stride)
     with torch.no_grad():
-        if forced_ids is not None:
-            ids = model.generate(input_features=feats, forced_decoder_ids=forced_ids, **gen_kwargs)
+        x = torch.nn.functional.gelu(enc.conv1(feats[..., :t]))
+        x = torch.nn.functional.gelu(enc.conv2(x)).permute(0, 2, 1)
+        x = x + enc.embed_positions.weight[:x.shape[1]]
+        for layer in enc.layers:
+            x = layer(x, None, layer_head_mask=None)[0]
+        return BaseModelOutput(last_hidden_state=enc.layer_norm(x))
+
+def _assistant_args(model, assistant, feats, use_cache, n_frames=None):
+    """
+    generate() kwargs for speculative decoding: `assistant` (a smaller Whisper sharing the
+    tokenizer) drafts a few tokens per step and `model` checks them all in one forward pass,
+    so the output is what `model` alone would produce. Needs the KV cache and batch size 1.
+    """
+    if assistant is None or not use_cache or feats.shape[0] != 1:
+        return {}
+    if assistant.config.num_mel_bins != model.config.num_mel_bins:
+        return {}
+    a_feats = feats.to(next(assistant.parameters()).dtype)
+    return {"assistant_model": assistant,
+            "assistant_encoder_outputs": _encode(assistant, a_feats, True, n_frames)["encoder_outputs"]}
+
+def _short_frames(processor, audio16, encoder_mode=None):
+    """Mel frames to encode in short-form mode, or None to use the full 30 s."""
+    encoder_mode = (encoder_mode or ENCODER_MODE).lower()
+    if encoder_mode not in ENCODER_MODES:
+        raise ValueError(f"encoder_mode must be one of {ENCODER_MODES}, got {encoder_mode!r}")
+    fe = processor.feature_extractor
+    n = int((len(audio16) + SHORT_MARGIN_SEC * TARGET_SR) // fe.hop_length)
+    if encoder_mode == "full" or n >= fe.nb_max_frames:
+        return None
+    return n
+
+def _suspicious(text, seconds):
+    """
+    Quality guard for short-form decodes: nothing recognised in a real clip, a
+    repetition loop (Whisper's own gzip-ratio threshold), or more text than can
+    have been said in the time.
+    """
+    text = text.strip()
+    if not text:
+        return seconds >= 0.5
+    raw = text.encode("utf-8")
+    if len(raw) > 24 and len(raw) / len(zlib.compress(raw)) > 2.4:
+        return True
+    return len(text) > 25 * max(seconds, 1.0)
+
+def transcribe(processor, model, audio16, forced_lang: str = "auto",
+               device=torch.device("cpu"), decode_mode: str | None = None,
+               input_features=None, encoder_mode: str | None = None, assistant_model=None) -> str:
+    """
+    One Whisper decode of a 16 kHz mono clip (the release path of run_decode, and offline tools).
+    input_features, if given, are used instead of running the feature extractor on audio16.
+    assistant_model turns on speculative decoding (see _assistant_args).
+    """
+    model_dtype = next(model.parameters()).dtype
+    gen_kwargs = _generation_args(processor, model, forced_lang, decode_mode)
+    if input_features is not None:
+        feats = input_features.to(device=device, dtype=model_dtype)
+    else:
+        feats = _features(processor, audio16, device, model_dtype)
+    n_frames = _short_frames(processor, audio16, encoder_mode)
+
+    def _run(n_frames):
+        with torch.no_grad(), autocast_for(model):
+            ids = model.generate(**_encode(model, feats, gen_kwargs["use_cache"], n_frames), **gen_kwargs,
+                                 **_assistant_args(model, assistant_model, feats, gen_kwargs["use_cache"], n_frames))
+        return processor.batch_decode(ids, skip_special_tokens=True)[0].strip()
+
+    text = _run(n_frames)
+    if n_frames is not None and _suspicious(text, len(audio16) / TARGET_SR):
+        text = _run(None)
+    return text
+
+def transcribe_batch(processor, model, clips, forced_lang: str = "auto",
+                     device=torch.device("cpu"), decode_mode: str | None = None,
+                     encoder_mode: str | None = None, batch_size: int = 8) -> list:
+    """
+    transcribe() for many 16 kHz clips. Clips are sorted by length and decoded
+    batch_size at a time, so each generate() call pads to similar lengths (in short-form
+    mode the encoder only sees the longest clip of its batch). Results keep input order.
+    """
+    model_dtype = next(model.parameters()).dtype
+    gen_kwargs = _generation_args(processor, model, forced_lang, decode_mode)
+    order = sorted(range(len(clips)), key=lambda i: len(clips[i]))
+    texts = [""] * len(clips)
+    for b in range(0, len(order), max(1, batch_size)):
+        idx = order[b:b + max(1, batch_size)]
+        batch = [np.asarray(clips[i], dtype=np.float32) for i in idx]
+        feats = _features(processor, batch, device, model_dtype)
+        n_frames = _short_frames(processor, batch[-1], encoder_mode)
+        with torch.no_grad(), autocast_for(model):
+            ids = model.generate(**_encode(model, feats, gen_kwargs["use_cache"], n_frames), **gen_kwargs)
+        for i, audio, text in zip(idx, batch, processor.batch_decode(ids, skip_special_tokens=True)):
+            text = text.strip()
+            if n_frames is not None and _suspicious(text, len(audio) / TARGET_SR):
+                text = transcribe(processor, model, audio, forced_lang, device, decode_mode,
+                                  encoder_mode="full")
+            texts[i] = text
+    return texts
+
+def decode_words(processor, model, audio16, forced_lang: str = "auto",
+                 device=torch.device("cpu"), decode_mode: str | None = None,
+                 encoder_mode: str | None = None, assistant_model=None):
+    """Like transcribe(), but returns (word, end_sec) pairs for the streaming commit policy."""
+    gen_kwargs = _generation_args(processor, model, forced_lang, decode_mode)
+    dtype = next(model.parameters()).dtype
+    n_frames = _short_frames(processor, audio16, encoder_mode)
+    words = _decode_words(processor, model, audio16, device, dtype, gen_kwargs, n_frames, assistant_model)
+    if n_frames is not None and _suspicious(" ".join(w for w, _ in words), len(audio16) / TARGET_SR):
+        words = _decode_words(processor, model, audio16, device, dtype, gen_kwargs, None, assistant_model)
+    return words
+
+def _group_words(processor, ids, times=None):
+    """Split generated token ids into (word, end_sec) using Whisper's leading-space tokens."""
+    tok = processor.tokenizer
+    skip = set(tok.all_special_ids)
+    ts_begin = tok.all_special_ids[-1] + 1
+    words, cur = [], []
+
+    def _flush(end):
+        if cur:
+            w = tok.decode(cur).strip()
+            if w: words.append((w, end))
+            cur.clear()
+
+    for i, tid in enumerate(ids):
+        end = float(times[i]) if times is not None else None
+        if tid in skip or tid >= ts_begin:
+            _flush(end)
+            continue
+        if cur and tok.convert_ids_to_tokens(tid).startswith("Ġ"):
+            _flush(end)
+        cur.append(tid)
+    _flush(None)
+    return words
+
+def _decode_words(processor, model, audio16, device, dtype, gen_kwargs, n_frames=None, assistant_model=None):
+    """One decode of `audio16`, returned as words with end times when the checkpoint has alignment heads."""
+    # DTW token timings read the per-step cross-attentions, which only line up with the KV cache on
+    with_times = (getattr(model.generation_config, "alignment_heads", None) is not None
+                  and gen_kwargs["use_cache"])
+    feats = _features(processor, audio16, device, dtype)
+    with torch.no_grad(), autocast_for(model):
+        inputs = _encode(model, feats, gen_kwargs["use_cache"], n_frames)
+        inputs.update(_assistant_args(model, assistant_model, feats, gen_kwargs["use_cache"], n_frames))
+        if with_times:
+            out = model.generate(**inputs, **gen_kwargs, return_token_timestamps=True,
+                                 num_frames=len(audio16) // processor.feature_extractor.hop_length)
+            ids, times = out["sequences"][0].tolist(), out["token_timestamps"][0].tolist()
         else:
-            ids = model.generate(input_features=feats, **gen_kwargs)
+            ids, times = model.generate(**inputs, **gen_kwargs)[0].tolist(), None
+    return _group_words(processor, ids, times)
+
+def _hold(window, cap, inbuf, gate, on_audio=None, emit_endpoint=None):
+    """Drain the mic ring until release, or until the VAD endpoints when AUTO_RELEASE_SEC is set."""
+    while getattr(window, "recording", False):
+        if not cap.pump(inbuf, on_audio):
+            time.sleep(0.02)
+            continue
+        if AUTO_RELEASE_SEC > 0 and gate is not None and gate.endpoint(AUTO_RELEASE_SEC):
+            if emit_endpoint:
+                try: emit_endpoint()
+                except Exception: pass
+            return True
+    return False
+
+def run_decode(window, fs, backend, inbuf, emit_text, emit_finalize,
+               emit_progress=None, forced_lang: str = "auto", streaming: bool = False,
+               emit_endpoint=None, emit_stable=None):
+    """
+    Collect audio while held, then run ONE decode on release through `backend`
+    (an asr.backends.ASRBackend, so either engine works here).
+    Supports forced_lang in {"en","ar","auto"} to bias multilingual checkpoints.
+    With streaming=True, rolling windows are decoded while the button is held and
+    stable words are committed early, so release only pays for the unstable tail.
+    With VAD on, only voiced phrases reach the model (each decoded on its own), and
+    emit_endpoint is called when AUTO_RELEASE_SEC of silence ends the hold early.
+    emit_stable gets the best transcript so far at release, before the final decode, so the
+    tutor reply can be started speculatively (streaming mode only).
+    """
+    if streaming:
+        return _run_streaming(window, fs, backend, inbuf, emit_text, emit_finalize,
+                              emit_progress, forced_lang, emit_endpoint, emit_stable)
+
+    cap = _Capture(getattr(window, "mic_sr", fs))
+    gate = VoiceGate() if VAD else None
+    # log-mel frames are computed during the hold, so release only finishes the last few
+    phrases = _Phrases(cap, backend.frontend, gate)
+
+    if not _hold(window, cap, inbuf, gate, phrases.push, emit_endpoint):
+        cap.pump(inbuf, phrases.push)  # whatever arrived between the last poll and release
+
+    if emit_progress:
+        try: emit_progress(10)
+        except Exception: pass
+
+    parts = phrases.finish()
+    if not parts:
+        emit_finalize(time.time())
+        return
+
+    if emit_progress:
+        try: emit_progress(35)
+        except Exception: pass
+
+    texts = []
+    for i, (audio16, feats) in enumerate(parts):
+        texts.append(backend.transcribe(audio16, forced_lang, input_features=feats))
+        if emit_progress and len(parts) > 1:
+            try: emit_progress(35 + (92 - 35) * (i + 1) // len(parts))
+            except Exception: pass
+    text = " ".join(t for t in texts if t)
+
+    if emit_progress:
+        try: emit_progress(92)
+        except Exception: pass
+
+    emit_text(text)
+
+    if emit_progress:
+        try: emit_progress(100)
+        except Exception: pass
+    emit_finalize(time.time())
+
+def _run_streaming(window, fs, backend, inbuf, emit_text, emit_finalize,
+                   emit_progress=None, forced_lang="auto", emit_endpoint=None, emit_stable=None):
+    """
+    LocalAgreement-2 streaming: re-decode the uncommitted buffer every STREAM_STEP_SEC,
+    commit words two consecutive hypotheses agree on, and drop the audio behind the
+    last committed word so the buffer only ever holds the unstable tail.
+    With VAD on, silence before the first phrase is dropped instead of decoded, and
+    silence after the last one is cut before the final decode.
+    """
+    cap = _Capture(getattr(window, "mic_sr", fs))
+    gate = VoiceGate() if VAD else None
+    step = int(STREAM_STEP_SEC * TARGET_SR)
+
+    agree = LocalAgreement()
+    decoded_at = 0  # len(cap) at the last decode
+
+    def _decode():
+        return backend.transcribe_words(cap.view(), forced_lang)
+
+    def _on_audio(y):
+        if gate is not None:
+            gate.push(y)
+
+    ended = False  # auto-released by the VAD
+    while getattr(window, "recording", False):
+        if not cap.pump(inbuf, _on_audio):
+            time.sleep(0.02)
+            continue
+        if AUTO_RELEASE_SEC > 0 and gate is not None and gate.endpoint(AUTO_RELEASE_SEC):
+            if emit_endpoint:
+                try: emit_endpoint()
+                except Exception: pass
+            ended = True
+            break
+        if gate is not None and not gate.voiced_any:
+            # nothing said yet: keep only the pre-roll, measured from where a phrase that
+            # is still too short to count began, so its onset survives until it does count
+            start = gate.pending_start
+            keep_from = (cap.total if start is None else start) - gate.pre
+            cap.drop(max(0, keep_from - (cap.total - len(cap))))
+            decoded_at = len(cap)
+            continue
+        if len(cap) - decoded_at < step:
+            continue
+
+        agree.insert(_decode())
+        cut = agree.trim_point()
+        if cut is None and len(cap) > STREAM_MAX_BUFFER_SEC * TARGET_SR:
+            # no word timings (or nothing agreed for too long): take the hypothesis as-is
+            agree.commit_all()
+            agree.on_trim(len(cap) / TARGET_SR)
+            cap.drop(len(cap))
+        elif cut is not None and cut > 0:
+            cap.drop(int(cut * TARGET_SR))
+            agree.on_trim(cut)
+        decoded_at = len(cap)
+        emit_text(agree.text())
+    if not ended:
+        cap.pump(inbuf, _on_audio)
+
+    # trailing silence after the last phrase never reaches the model
+    end = cap.total
+    if gate is not None:
+        segs = gate.segments()
+        end = segs[-1][1] if segs else 0
+    tail = cap.span(cap.total - len(cap), end)
+
+    if emit_progress:
+        try: emit_progress(10)
+        except Exception: pass
+
+    if not len(tail) and not agree.committed:
+        emit_finalize(time.time())
+        return
+
+    if emit_stable and agree.text():
+        try: emit_stable(agree.text())
+        except Exception: pass
+
+    if emit_progress:
+        try: emit_progress(35)
+        except Exception: pass
+
+    text = agree.finish(backend.transcribe_words(tail, forced_lang) if len(tail) else [])
 
     if emit_progress:
         try: emit_progress(92)
         except Exception: pass
 
-    text = processor.batch_decode(ids, skip_special_tokens=True)[0].strip()
     emit_text(text)
 
     if emit_progress:
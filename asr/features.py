@@ -0,0 +1,122 @@
+# asr/features.py
+from __future__ import annotations
+from typing import Tuple
+
+import numpy as np
+import torch
+
+def _constants(fe) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hann window and transposed mel filterbank for a feature extractor, built once and
+    kept on the extractor itself, so they live and die with it (no id() reuse, no
+    process-wide cache growing with every model reload).
+    """
+    hit = getattr(fe, "_incremental_log_mel", None)
+    if hit is None or len(hit[0]) != fe.n_fft:
+        n = np.arange(fe.n_fft)
+        window = (0.5 - 0.5 * np.cos(2 * np.pi * n / fe.n_fft)).astype(np.float32)  # periodic, as torch.hann_window
+        mel_t = np.ascontiguousarray(np.asarray(fe.mel_filters, dtype=np.float32).T)  # (n_mels, n_freqs)
+        hit = fe._incremental_log_mel = (window, mel_t)
+    return hit
+
+class IncrementalLogMel:
+    """
+    Whisper log-mel frontend that does its work while audio is still arriving.
+
+    push() takes 16 kHz samples as they are captured and computes every STFT frame
+    whose 400-sample window is complete (log10 mel energies, stored in a
+    preallocated 30 s array). finish() fills in the last few frames plus the
+    all-silence padding, applies Whisper's global clamp/scale, and returns the same
+    (1, n_mels, 3000) input_features the WhisperFeatureExtractor would have, so
+    release only pays for a handful of frames.
+
+    Like the feature extractor, only the first 30 s are used.
+    """
+
+    def __init__(self, feature_extractor):
+        fe = feature_extractor
+        self.n_fft, self.hop = fe.n_fft, fe.hop_length
+        self.n_samples = fe.n_samples              # 30 s
+        self.n_frames = self.n_samples // self.hop  # 3000, after dropping the last STFT frame
+        self.window, self.mel_t = _constants(fe)
+        self._pad = self.n_fft // 2
+        # centred STFT input: reflect pad | audio (zero-padded to 30 s) | reflect pad
+        self._p = np.zeros(self.n_samples + 2 * self._pad, dtype=np.float32)
+        self._log = np.empty((self.mel_t.shape[0], self.n_frames), dtype=np.float32)
+        self.reset()
+
+    @classmethod
+    def from_processor(cls, processor) -> "IncrementalLogMel":
+        return cls(processor.feature_extractor)
+
+    def reset(self) -> None:
+        self._p[:] = 0.0
+        self.n = 0        # samples pushed (capped at 30 s)
+        self.done = 0     # frames computed
+        self._left = False  # left reflect pad filled in
+
+    def push(self, x) -> None:
+        x = np.asarray(x, dtype=np.float32).reshape(-1)[: self.n_samples - self.n]
+        if not len(x):
+            return
+        self._p[self._pad + self.n:self._pad + self.n + len(x)] = x
+        self.n += len(x)
+        if not self._left and self.n > self._pad:
+            self._fill_left()
+        if self._left:
+            # frame i reads _p[i*hop : i*hop + n_fft]
+            ready = min(self.n_frames, (self._pad + self.n - self.n_fft) // self.hop + 1)
+            self._compute(self.done, ready)
+
+    def finish(self, n: int | None = None) -> torch.Tensor:
+        """
+        input_features for everything pushed so far (or just its first n samples),
+        as a (1, n_mels, 3000) float32 tensor.
+        """
+        if n is not None and n < self.n:
+            self._truncate(n)
+        if not self._left:
+            self._fill_left()  # reflects into the zero padding for clips under n_fft/2
+        # right reflect pad of the 30 s signal (all zeros unless the clip fills the 30 s)
+        end = self._pad + self.n_samples
+        self._p[end:] = self._p[end - 2:end - 2 - self._pad:-1]
+
+        # frames after this one only see zero padding: log10(1e-10) = -10
+        silent = self.n_frames
+        if self.n < self.n_samples - self._pad:
+            silent = min(self.n_frames, -(-(self._pad + self.n) // self.hop))
+        self._compute(self.done, silent)
+        self._log[:, silent:] = -10.0
+
+        out = np.maximum(self._log, self._log.max() - 8.0)
+        out += 4.0
+        out /= 4.0
+        return torch.from_numpy(out)[None]
+
+    def _truncate(self, n: int) -> None:
+        # forget samples past n; frames whose window reached them get recomputed
+        n = max(0, n)
+        self._p[self._pad + n:self._pad + self.n] = 0.0
+        self.n = n
+        if n <= self._pad:
+            self._left = False
+            self.done = 0
+        else:
+            self.done = min(self.done, max(0, (self._pad + n - self.n_fft) // self.hop + 1))
+
+    def _fill_left(self) -> None:
+        a = self._pad
+        self._p[:a] = self._p[2 * a:a:-1]
+        self._left = True
+
+    def _compute(self, i0: int, i1: int) -> None:
+        if i1 <= i0:
+            return
+        start = i0 * self.hop
+        span = self._p[start:start + (i1 - i0 - 1) * self.hop + self.n_fft]
+        frames = np.lib.stride_tricks.sliding_window_view(span, self.n_fft)[::self.hop]
+        spec = np.fft.rfft(frames * self.window, axis=-1)
+        power = (spec.real ** 2 + spec.imag ** 2).astype(np.float32)
+        mel = self.mel_t @ power.T
+        np.log10(np.maximum(mel, 1e-10), out=self._log[:, i0:i1])
+        self.done = i1
@@ -0,0 +1,62 @@
+# asr/precision.py
+from __future__ import annotations
+import contextlib
+import os
+import re
+
+import torch
+import transformers
+
+# "fp32": weights and math in float32 (reference)
+# "bf16": bfloat16 weights, inference under CPU autocast (fp32 kept for the ops that need it)
+# "int8": torch dynamic quantization of every nn.Linear (int8 weights, fp32 activations)
+PRECISIONS = ("fp32", "bf16", "int8")
+PRECISION = os.environ.get("ASR_PRECISION", "fp32").lower()
+
+# Converted models are pickled here so the conversion only happens once per checkpoint
+CACHE_DIR = os.path.expanduser(os.environ.get("ASR_CACHE_DIR", "~/.cache/darija-tutor/asr"))
+
+def check_precision(precision: str | None) -> str:
+    precision = (precision or PRECISION).lower()
+    if precision not in PRECISIONS:
+        raise ValueError(f"precision must be one of {PRECISIONS}, got {precision!r}")
+    return precision
+
+def cache_path(repo: str, precision: str) -> str:
+    # pickled modules are only safe to reload with the same torch/transformers
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "--", repo)
+    tag = f"torch{torch.__version__.split('+')[0]}-tf{transformers.__version__}"
+    return os.path.join(CACHE_DIR, f"{slug}.{precision}.{tag}.pt")
+
+def convert(model: torch.nn.Module, precision: str) -> torch.nn.Module:
+    precision = check_precision(precision)
+    if precision == "bf16":
+        return model.to(torch.bfloat16)
+    if precision == "int8":
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model
+
+def load_cached(repo: str, precision: str):
+    """A previously converted model, or None. Unreadable cache files are treated as missing."""
+    path = cache_path(repo, precision)
+    if precision == "fp32" or not os.path.exists(path):
+        return None
+    try:
+        return torch.load(path, map_location="cpu")
+    except Exception:
+        return None
+
+def save_cached(model: torch.nn.Module, repo: str, precision: str) -> None:
+    if precision == "fp32":
+        return  # fp32 already lives in the Hugging Face cache
+    path = cache_path(repo, precision)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    torch.save(model, tmp)
+    os.replace(tmp, path)
+
+def autocast_for(model: torch.nn.Module):
+    """Context manager to run `model` in: CPU bf16 autocast for bf16 weights, no-op otherwise."""
+    if next(model.parameters()).dtype == torch.bfloat16:
+        return torch.autocast("cpu", dtype=torch.bfloat16)
+    return contextlib.nullcontext()
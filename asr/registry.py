@@ -0,0 +1,136 @@
+# asr/registry.py
+from __future__ import annotations
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+from asr import precision as prec
+from asr.backends import ASRBackend, ENGINE, load_backend
+
+# Loaded checkpoints are kept until their weights exceed this budget (LRU eviction)
+MODEL_BUDGET_MB = float(os.environ.get("ASR_MODEL_BUDGET_MB", "4096"))
+
+Key = Tuple[str, str, str]  # (engine, model, precision)
+
+class ModelRegistry:
+    """
+    Process-wide cache of loaded ASR backends, keyed by (engine, model, precision).
+
+    Loads run on one background thread (so two requests for the same model share a
+    single load), finished backends are kept in LRU order, and the least recently used
+    ones are dropped once the total weight size goes over the budget.
+
+    A "main+draft" model (speculative decoding) is put together from the registry's
+    own entries for main and draft, so it shares their weights and costs nothing
+    extra against the budget; it is dropped along with either of them.
+    """
+
+    def __init__(self, budget_mb: float = MODEL_BUDGET_MB,
+                 loader: Callable[[str, str, str], ASRBackend] = load_backend):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self._loader = loader
+        self._lock = threading.Lock()
+        self._loaded: "OrderedDict[Key, Tuple[ASRBackend, int]]" = OrderedDict()
+        self._pending: Dict[Key, Future] = {}
+        self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="asr-load")
+
+    @staticmethod
+    def _key(model: str, precision: Optional[str], engine: Optional[str]) -> Key:
+        return ((engine or ENGINE or "transformers").lower(), model, prec.check_precision(precision))
+
+    @staticmethod
+    def _parts(key: Key) -> List[Key]:
+        # the entries a "main+draft" key is built from; engines without a draft mode use main alone
+        engine, model, precision = key
+        if "+" not in model:
+            return []
+        main, _, draft = model.partition("+")
+        names = [main, draft] if engine == "transformers" else [main]
+        return [(engine, name, precision) for name in names]
+
+    def _hit(self, key: Key) -> Optional[ASRBackend]:
+        # caller holds the lock; a "main+draft" pair is assembled here if both halves are loaded
+        hit = self._loaded.get(key)
+        parts = self._parts(key)
+        if hit is None and parts and all(p in self._loaded for p in parts):
+            backends = [self._loaded[p][0] for p in parts]
+            hit = (backends[0].with_draft(backends[1]) if len(backends) > 1 else backends[0], 0)
+            self._loaded[key] = hit
+        if hit is None:
+            return None
+        for k in parts + [key]:
+            self._loaded.move_to_end(k)
+        return hit[0]
+
+    def get(self, model: str, precision: Optional[str] = None,
+            engine: Optional[str] = None) -> Optional[ASRBackend]:
+        """The loaded backend for `model`, or None. Never blocks on a load."""
+        key = self._key(model, precision, engine)
+        with self._lock:
+            return self._hit(key)
+
+    def load_async(self, model: str, precision: Optional[str] = None,
+                   on_done: Optional[Callable[[Future], None]] = None,
+                   engine: Optional[str] = None) -> Future:
+        """
+        Future resolving to an ASRBackend. Already-loaded models resolve immediately;
+        on_done is called from the loader thread (or inline, if already done).
+        """
+        key = self._key(model, precision, engine)
+        with self._lock:
+            hit = self._hit(key)
+            if hit is not None:
+                fut: Future = Future()
+                fut.set_result(hit)
+            else:
+                fut = self._pending.get(key)
+                if fut is None:
+                    fut = self._pool.submit(self._load, key)
+                    self._pending[key] = fut
+        if on_done is not None:
+            fut.add_done_callback(on_done)
+        return fut
+
+    def load(self, model: str, precision: Optional[str] = None,
+             engine: Optional[str] = None) -> ASRBackend:
+        return self.load_async(model, precision, engine=engine).result()
+
+    def loaded(self) -> List[Key]:
+        with self._lock:
+            return list(self._loaded)
+
+    def _load(self, key: Key) -> ASRBackend:
+        try:
+            # a "main+draft" pair loads whichever halves are missing, then is assembled by _hit
+            for part in self._parts(key) or [key]:
+                with self._lock:
+                    if part in self._loaded:
+                        continue
+                backend = self._loader(*part)
+                size = backend.nbytes()
+                with self._lock:
+                    self._loaded[part] = (backend, size)
+            with self._lock:
+                backend = self._hit(key)
+                self._evict(keep=key)
+                return backend
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _evict(self, keep: Key) -> None:
+        protected = {keep, *self._parts(keep)}
+        total = sum(size for _, size in self._loaded.values())
+        for key in list(self._loaded):
+            if total <= self.budget:
+                break
+            if key in protected or key not in self._loaded:
+                continue
+            total -= self._loaded.pop(key)[1]
+            # pairs built on the evicted model go with it
+            for pair in [k for k in self._loaded if key in self._parts(k)]:
+                del self._loaded[pair]
+
+REGISTRY = ModelRegistry()
@@ -0,0 +1,94 @@
+# asr/resample.py
+from __future__ import annotations
+from math import ceil, gcd
+from typing import Optional
+
+import numpy as np
+
+class PolyphaseResampler:
+    """
+    Streaming rational resampler (sr_out/sr_in = L/M) with a Kaiser-windowed sinc
+    low-pass, evaluated in polyphase form: each output sample is one K-tap dot
+    product, and the last K-1 input samples are carried between blocks so the
+    result does not depend on how the audio was chopped up.
+
+    The cutoff sits just under the lower Nyquist frequency, so 44.1/48 kHz mic
+    input is anti-aliased before it lands at 16 kHz.
+    """
+
+    def __init__(self, sr_in: int, sr_out: int = 16000, zeros: int = 16,
+                 rolloff: float = 0.94, beta: float = 8.6):
+        g = gcd(int(sr_in), int(sr_out))
+        self.sr_in, self.sr_out = int(sr_in), int(sr_out)
+        self.L, self.M = self.sr_out // g, self.sr_in // g
+        self.passthrough = self.L == self.M
+
+        # `zeros` sinc lobes each side of the (narrower) cutoff, with the centre tap on a
+        # multiple of M so the group delay is a whole number of output samples
+        fc = 0.5 * rolloff / max(self.L, self.M)  # cycles per sample at the upsampled rate
+        self.delay = int(ceil(zeros / (2 * fc) / self.M))  # in output samples
+        centre = self.delay * self.M
+        span = 2 * centre + 1
+        self.K = int(ceil(span / self.L))  # taps per phase
+        h = np.zeros(self.K * self.L)
+        t = np.arange(span) - centre
+        h[:span] = 2 * fc * np.sinc(2 * fc * t) * np.kaiser(span, beta) * self.L
+        # H[p] holds taps p, p+L, p+2L, ... reversed, so a window of x in time order dots straight in
+        self._H = np.ascontiguousarray(h.reshape(self.K, self.L).T[:, ::-1], dtype=np.float32)
+
+        self.reset()
+
+    def reset(self) -> None:
+        self._hist = np.zeros(self.K - 1, dtype=np.float32)
+        self._n_in = 0    # input samples seen so far
+        self._n_out = 0   # output samples produced so far
+
+    def max_out(self, n_in: int) -> int:
+        """Upper bound on samples one process() call of n_in inputs can return."""
+        return (n_in * self.L) // self.M + 1
+
+    def process(self, x: np.ndarray, out: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Resample the next block. Results are written into `out` (at least
+        max_out(len(x)) long) and the filled prefix is returned; without `out` a
+        new array is allocated.
+        """
+        x = np.asarray(x, dtype=np.float32).reshape(-1)
+        if self.passthrough:
+            if out is None:
+                return x.copy()
+            out[:len(x)] = x
+            return out[:len(x)]
+
+        n_in = self._n_in + len(x)
+        # outputs whose newest tap index floor(n*M/L) has arrived
+        n_end = (n_in * self.L + self.M - 1) // self.M if n_in else 0
+        n = np.arange(self._n_out, n_end, dtype=np.int64)
+        if out is None:
+            out = np.empty(len(n), dtype=np.float32)
+        y = out[:len(n)]
+
+        if len(n):
+            xx = np.concatenate([self._hist, x])
+            # newest input feeding output n, as an index into xx (which starts K-1 samples back)
+            newest = (n * self.M) // self.L - (self._n_in - (self.K - 1))
+            frames = np.lib.stride_tricks.sliding_window_view(xx, self.K)[newest - (self.K - 1)]
+            np.einsum("ij,ij->i", self._H[(n * self.M) % self.L], frames, out=y)
+            self._hist = xx[len(xx) - (self.K - 1):].copy()
+        elif len(x):
+            self._hist = np.concatenate([self._hist, x])[-(self.K - 1):]
+
+        self._n_in = n_in
+        self._n_out = n_end
+        return y
+
+def resample(x: np.ndarray, sr_in: int, sr_out: int = 16000) -> np.ndarray:
+    """One-shot resample of a whole clip, with the filter delay removed."""
+    rs = PolyphaseResampler(sr_in, sr_out)
+    if rs.passthrough:
+        return np.asarray(x, dtype=np.float32).copy()
+    want = int(round(len(x) * rs.L / rs.M))
+    d = rs.delay
+    pad = np.zeros(int(ceil((d + 1) * rs.M / rs.L)) + rs.K, dtype=np.float32)
+    y = np.concatenate([rs.process(x), rs.process(pad)])
+    return y[d:d + want]
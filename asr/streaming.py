@@ -0,0 +1,69 @@
+# asr/streaming.py
+from __future__ import annotations
+from typing import List, Optional, Sequence, Tuple
+
+# (word, end time in seconds relative to the current audio buffer, or None if unknown)
+Word = Tuple[str, Optional[float]]
+
+_PUNCT = ".,!?;:\"'()[]{}،؛؟…-"
+
+def _key(w: str) -> str:
+    return w.lower().strip(_PUNCT)
+
+class LocalAgreement:
+    """
+    LocalAgreement-2 commit policy for rolling-window Whisper decoding.
+
+    Every decode of the (uncommitted) audio buffer yields a hypothesis. A word is
+    committed once two consecutive hypotheses agree on it, so the committed
+    prefix never changes on screen; only the tail after it stays tentative.
+    """
+
+    def __init__(self):
+        self.committed: List[str] = []   # every committed word, whole utterance
+        self._prev: List[Word] = []      # last hypothesis for the current buffer
+        self._in_buffer = 0              # committed words still inside the buffer
+
+    def insert(self, hyp: Sequence[Word]) -> List[Word]:
+        """Feed a new hypothesis for the buffer; returns the newly committed words."""
+        hyp = list(hyp)
+        n = self._in_buffer
+        new: List[Word] = []
+        for a, b in zip(self._prev[n:], hyp[n:]):
+            if _key(a[0]) != _key(b[0]) or not _key(b[0]):
+                break
+            new.append(b)
+        self.committed.extend(w for w, _ in new)
+        self._in_buffer += len(new)
+        self._prev = hyp
+        return new
+
+    def tentative(self) -> List[str]:
+        return [w for w, _ in self._prev[self._in_buffer:]]
+
+    def trim_point(self) -> Optional[float]:
+        """End time of the last committed word in the buffer, if it is known."""
+        if self._in_buffer == 0:
+            return None
+        return self._prev[self._in_buffer - 1][1]
+
+    def on_trim(self, seconds: float) -> None:
+        """The caller dropped `seconds` of audio that held every committed word."""
+        self._prev = [(w, None if t is None else t - seconds)
+                      for w, t in self._prev[self._in_buffer:]]
+        self._in_buffer = 0
+
+    def commit_all(self) -> None:
+        """Force the tentative tail through, e.g. when the buffer must be dropped."""
+        self.committed.extend(self.tentative())
+        self._in_buffer = len(self._prev)
+
+    def text(self) -> str:
+        return " ".join(self.committed + self.tentative()).strip()
+
+    def finish(self, hyp: Sequence[Word]) -> str:
+        """Final decode of the remaining buffer; everything left is committed."""
+        tail = [w for w, _ in list(hyp)[self._in_buffer:]]
+        self.committed.extend(tail)
+        self._prev, self._in_buffer = [], 0
+        return " ".join(self.committed).strip()
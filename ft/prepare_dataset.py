@@ -28,9 +28,9 @@ from ft.config import (
 
 # Reuse your existing transliterator
 try:
-    from utils.arabizi import arabic_to_arabizi, has_arabic_chars
+    from utils.arabizi import has_arabic_chars, transliterate_batch
 except Exception:
-    arabic_to_arabizi = None
+    transliterate_batch = None
     has_arabic_chars = lambda s: False  # type: ignore
 
 
@@ -83,29 +83,35 @@ def main() -> None:
     out_path = TRAIN_JSONL
     written = 0
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        for ex in ds:
-            en_msgs = ex.get(DATASET_COL_MESSAGES_EN) or []
-            dar_msgs = ex.get(DATASET_COL_MESSAGES_DAR) or []
+    pairs = []
+    for ex in ds:
+        en_msgs = ex.get(DATASET_COL_MESSAGES_EN) or []
+        dar_msgs = ex.get(DATASET_COL_MESSAGES_DAR) or []
+
+        user_en = _pick_turn(en_msgs, "user")
+        asst_dar = _pick_turn(dar_msgs, "assistant")
 
-            user_en = _pick_turn(en_msgs, "user")
-            asst_dar = _pick_turn(dar_msgs, "assistant")
+        if user_en and asst_dar:
+            pairs.append((user_en, asst_dar))
 
-            if not user_en or not asst_dar:
-                continue
+    # Optional augmentation: also teach Arabizi output style (transliterated in one pooled batch)
+    arabizi = [None] * len(pairs)
+    if INCLUDE_ARABIZI_AUGMENT and transliterate_batch is not None:
+        todo = [i for i, (_, asst_dar) in enumerate(pairs) if has_arabic_chars(asst_dar)]
+        for i, asst_az in zip(todo, transliterate_batch(pairs[i][1] for i in todo)):
+            arabizi[i] = asst_az
 
+    with open(out_path, "w", encoding="utf-8") as f:
+        for (user_en, asst_dar), asst_az in zip(pairs, arabizi):
             # Primary training example: English user -> Darija assistant (Arabic script)
             text1 = _format_chat(tokenizer, SYSTEM_PROMPT_DARIJA_ARABIC, user_en, asst_dar)
             f.write(json.dumps({"text": text1}, ensure_ascii=False) + "\n")
             written += 1
 
-            # Optional augmentation: also teach Arabizi output style
-            if INCLUDE_ARABIZI_AUGMENT and arabic_to_arabizi is not None:
-                if has_arabic_chars(asst_dar):
-                    asst_az = arabic_to_arabizi(asst_dar)
-                    text2 = _format_chat(tokenizer, SYSTEM_PROMPT_DARIJA_ARABIZI, user_en, asst_az)
-                    f.write(json.dumps({"text": text2}, ensure_ascii=False) + "\n")
-                    written += 1
+            if asst_az is not None:
+                text2 = _format_chat(tokenizer, SYSTEM_PROMPT_DARIJA_ARABIZI, user_en, asst_az)
+                f.write(json.dumps({"text": text2}, ensure_ascii=False) + "\n")
+                written += 1
 
     print(f"[prepare_dataset] wrote {written} samples to {out_path}")
     print("[prepare_dataset] done")
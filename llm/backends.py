@@ -0,0 +1,204 @@
+# llm/backends.py
+from __future__ import annotations
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional
+
+# Before a backend has this many timed replies, hedge after HEDGE_DEFAULT_SEC
+HEDGE_MIN_SAMPLES = 5
+HEDGE_DEFAULT_SEC = float(os.environ.get("LLM_HEDGE_DEFAULT_SEC", "2.5"))
+# Consecutive failures that open a backend's circuit, and how long it stays open
+BREAKER_FAILURES = int(os.environ.get("LLM_BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN_SEC = float(os.environ.get("LLM_BREAKER_COOLDOWN_SEC", "30"))
+
+TokenFn = Callable[[str], None]
+
+class LatencyTracker:
+    """Rolling window of time-to-first-token (or full reply, for non-streaming backends)."""
+
+    def __init__(self, window: int = 50):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def add(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def p95(self, default: float = HEDGE_DEFAULT_SEC) -> float:
+        with self._lock:
+            if len(self._samples) < HEDGE_MIN_SAMPLES:
+                return default
+            s = sorted(self._samples)
+        return s[min(len(s) - 1, int(0.95 * len(s)))]
+
+class CircuitBreaker:
+    """
+    closed -> open after `failures` consecutive errors; open -> half-open after
+    `cooldown` seconds, letting one trial request through; its outcome closes or
+    re-opens the circuit.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, cooldown: float = BREAKER_COOLDOWN_SEC):
+        self.failures, self.cooldown = failures, cooldown
+        self._lock = threading.Lock()
+        self._errors = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self._opened_at >= self.cooldown else "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.cooldown or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def release(self) -> None:
+        """Hand back a half-open trial that ended without telling us anything (a lost hedge)."""
+        with self._lock:
+            self._trial = False
+
+    def success(self) -> None:
+        with self._lock:
+            self._errors, self._opened_at, self._trial = 0, None, False
+
+    def failure(self) -> None:
+        with self._lock:
+            self._errors += 1
+            if self._trial or self._errors >= self.failures:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+class LLMBackend:
+    """A named reply function `call(on_token) -> str` with its own latency stats and breaker."""
+
+    def __init__(self, name: str, call: Callable[..., str]):
+        self.name = name
+        self.call = call
+        self.latency = LatencyTracker()
+        self.breaker = CircuitBreaker()
+
+class _Lost(Exception):
+    """Raised into a hedged backend's stream once the other backend has won."""
+
+class _Consumer(Exception):
+    """Wraps an exception raised by the caller's own on_token, so it isn't blamed on the backend."""
+
+    def __init__(self, err: BaseException):
+        super().__init__(err)
+        self.err = err
+
+class _Attempt:
+    def __init__(self, backend: LLMBackend):
+        self.backend = backend
+        self.started = time.monotonic()
+        self.done = threading.Event()
+        self.reply: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+class BackendPool:
+    """
+    Sends each request to the first backend whose circuit allows it. If that backend
+    hasn't produced anything by its own p95 latency, the next allowed backend is fired
+    as a hedge; whichever streams first wins and the other is cut off at its next token.
+    Failures (not the caller's on_token errors, not lost hedges) feed the breakers.
+    """
+
+    def __init__(self, backends: List[LLMBackend]):
+        self.backends = backends
+
+    def call(self, *args, on_token: Optional[TokenFn] = None,
+             on_winner: Optional[Callable[[LLMBackend], None]] = None, **kw) -> str:
+        """on_winner, if given, is told which backend the returned reply came from."""
+        if not self.backends:
+            raise RuntimeError("no LLM backend configured (set OPENAI_API_KEY or TUTOR_API_URL)")
+        rest = iter(self.backends)
+
+        def _next() -> Optional[LLMBackend]:
+            return next((b for b in rest if b.breaker.allow()), None)
+
+        lock = threading.Lock()
+        winner: List[Optional[_Attempt]] = [None]
+        attempts: List[_Attempt] = []
+        wake = threading.Condition(lock)
+
+        def _run(att: _Attempt) -> None:
+            def _tok(piece: str) -> None:
+                with lock:
+                    if winner[0] is None:
+                        winner[0] = att
+                        att.backend.latency.add(time.monotonic() - att.started)
+                        wake.notify_all()
+                    if winner[0] is not att:
+                        raise _Lost()
+                if on_token is not None:
+                    try:
+                        on_token(piece)
+                    except Exception as e:
+                        raise _Consumer(e)
+            try:
+                att.reply = att.backend.call(*args, on_token=_tok, **kw)
+                att.backend.breaker.success()
+            except _Lost:
+                att.backend.breaker.release()
+            except _Consumer as e:
+                att.error = e.err
+                att.backend.breaker.release()
+            except Exception as e:
+                att.error = e
+                att.backend.breaker.failure()
+            with lock:
+                if att.reply is not None and winner[0] is None:
+                    winner[0] = att
+                    att.backend.latency.add(time.monotonic() - att.started)
+                att.done.set()
+                wake.notify_all()
+
+        def _fire(backend: LLMBackend) -> None:
+            att = _Attempt(backend)
+            attempts.append(att)
+            threading.Thread(target=_run, args=(att,), daemon=True).start()
+
+        # every circuit open: better a slow try than no reply at all
+        _fire(_next() or self.backends[0])
+        more = True  # backends left whose breakers might still let a request through
+        with lock:
+            while True:
+                w = winner[0]
+                if w is not None:
+                    break
+                failed = all(a.done.is_set() for a in attempts)
+                newest = attempts[-1]
+                wait = newest.backend.latency.p95() - (time.monotonic() - newest.started)
+                if more and (failed or wait <= 0):
+                    # the spare is only picked once it is about to be sent: allow() on a
+                    # half-open breaker takes its one trial slot
+                    spare = _next()
+                    if spare is None:
+                        more = False
+                    else:
+                        _fire(spare)  # fail over, or hedge a slower-than-usual attempt
+                    continue
+                if failed:
+                    break
+                wake.wait(timeout=max(0.01, wait) if more else None)
+
+        if w is None:
+            errors = [a.error for a in attempts if a.error is not None]
+            raise errors[-1] if errors else RuntimeError("LLM request failed")
+        w.done.wait()
+        if w.error is not None:
+            raise w.error
+        if on_winner is not None:
+            on_winner(w.backend)
+        return w.reply
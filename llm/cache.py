@@ -0,0 +1,154 @@
+# llm/cache.py
+from __future__ import annotations
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+from utils.score import normalize
+
+LLM_CACHE      = os.environ.get("LLM_CACHE", "on").lower() not in ("0", "off", "false", "no")
+CACHE_PATH     = os.path.expanduser(os.environ.get("LLM_CACHE_PATH", "~/.cache/darija-tutor/llm_cache.sqlite"))
+CACHE_TTL_SEC  = float(os.environ.get("LLM_CACHE_TTL_SEC", str(7 * 24 * 3600)))
+CACHE_MAX_ROWS = int(os.environ.get("LLM_CACHE_MAX_ROWS", "5000"))
+CACHE_MEM_ITEMS = int(os.environ.get("LLM_CACHE_MEM_ITEMS", "256"))
+
+_PUNCT_EDGES = re.compile(r"^[\s\"'.,!?;:]+|[\s\"'.,!?;:]+$")
+
+def normalize_prompt(text: str) -> str:
+    """Cache form of a transcript: lowercased, unified punctuation, single spaces, no edge punctuation."""
+    return _PUNCT_EDGES.sub("", " ".join(normalize(text).split()))
+
+def cache_key(transcript: str, lang: str, mode: str, output_script: Optional[str],
+              topics: Sequence[str] = (), backend: str = "") -> str:
+    """Everything that changes the reply: the normalized text, mode/script/lang, topics and which LLM answers."""
+    parts = [normalize_prompt(transcript), lang or "", mode or "", output_script or "", list(topics or ()), backend]
+    return hashlib.sha1(json.dumps(parts, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+class ResponseCache:
+    """
+    Two-tier reply cache: an in-memory LRU in front of an SQLite table.
+
+    Entries expire after `ttl` seconds; the table is trimmed to `max_rows` (least
+    recently used first) every so often on put(). If the database can't be opened,
+    the cache runs memory-only. Thread-safe; hit/miss counts are in stats().
+    """
+
+    TRIM_EVERY = 50  # puts between expiry/size sweeps of the table
+
+    def __init__(self, path: Optional[str] = CACHE_PATH, ttl: float = CACHE_TTL_SEC,
+                 max_rows: int = CACHE_MAX_ROWS, mem_items: int = CACHE_MEM_ITEMS):
+        self.ttl, self.max_rows, self.mem_items = ttl, max_rows, mem_items
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[str, tuple[str, float]]" = OrderedDict()
+        self._puts = 0
+        self.hits_mem = self.hits_disk = self.misses = 0
+        self._db = None
+        if path:
+            try:
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                self._db = sqlite3.connect(path, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS replies ("
+                    " key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, used REAL NOT NULL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS replies_used ON replies(used)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"[llm.cache] disk cache unavailable ({e}); memory only")
+                self._db = None
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None and now - hit[1] < self.ttl:
+                self._mem.move_to_end(key)
+                self.hits_mem += 1
+                return hit[0]
+            self._mem.pop(key, None)
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, created FROM replies WHERE key = ? AND created > ?",
+                        (key, now - self.ttl),
+                    ).fetchone()
+                    if row is not None:
+                        self._db.execute("UPDATE replies SET used = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        self._remember(key, row[0], row[1])
+                        self.hits_disk += 1
+                        return row[0]
+                except sqlite3.Error:
+                    pass
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str) -> None:
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is None:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO replies (key, value, created, used) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now),
+                )
+                self._puts += 1
+                if self._puts % self.TRIM_EVERY == 0:
+                    self._trim(now)
+                self._db.commit()
+            except sqlite3.Error:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM replies")
+                self._db.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits_mem + self.hits_disk + self.misses
+            return {
+                "hits_mem": self.hits_mem,
+                "hits_disk": self.hits_disk,
+                "misses": self.misses,
+                "hit_rate": (self.hits_mem + self.hits_disk) / lookups if lookups else 0.0,
+                "mem_items": len(self._mem),
+            }
+
+    def _remember(self, key: str, value: str, created: float) -> None:
+        self._mem[key] = (value, created)
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.mem_items:
+            self._mem.popitem(last=False)
+
+    def _trim(self, now: float) -> None:
+        self._db.execute("DELETE FROM replies WHERE created <= ?", (now - self.ttl,))
+        self._db.execute(
+            "DELETE FROM replies WHERE key IN ("
+            " SELECT key FROM replies ORDER BY used DESC LIMIT -1 OFFSET ?)",
+            (self.max_rows,),
+        )
+
+_CACHE: Optional[ResponseCache] = None
+_CACHE_LOCK = threading.Lock()
+
+def get_cache() -> Optional[ResponseCache]:
+    """The process-wide reply cache, or None when LLM_CACHE is off."""
+    global _CACHE
+    if not LLM_CACHE:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE is None:
+            _CACHE = ResponseCache()
+        return _CACHE
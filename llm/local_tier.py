@@ -0,0 +1,235 @@
+# llm/local_tier.py
+from __future__ import annotations
+import glob
+import itertools
+import json
+import math
+import os
+import pathlib
+import random
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from utils.score import normalize
+
+LOCAL_TIER = os.environ.get("LLM_LOCAL_TIER", "on").lower() not in ("0", "off", "false", "no")
+# classifier probability needed to answer without the LLM
+MIN_CONFIDENCE = float(os.environ.get("LLM_LOCAL_MIN_CONFIDENCE", "0.9"))
+# longer utterances always go to the LLM ("salam, how do I say bread?" is not small talk)
+MAX_WORDS = int(os.environ.get("LLM_LOCAL_MAX_WORDS", "4"))
+
+_ROOT = pathlib.Path(__file__).resolve().parent.parent
+LESSONS_DIR = _ROOT / "lessons"
+LEXICON_PATH = _ROOT / "data" / "darija_lexicon.json"
+
+OTHER = "other"
+
+# A turn with any of these words asks about something ("salam meaning", "say hello"):
+# it goes to the LLM however much it looks like small talk
+QUESTION_WORDS = frozenset("""
+    what how why which who when where mean means meaning say said saying translate translation
+    word spell spelling pronounce explain repeat english darija arabic arabizi
+    chno chnou chnu ach achno kifach kifech 3lach 3lah wach ma3na tarjama ngoul
+    شنو اش كيفاش علاش واش معنى ترجمة
+""".split())
+
+# Canned replies per intent, by output script ("en" when the reply is English); rotated per call
+REPLIES: Dict[str, Dict[str, List[str]]] = {
+    "greet": {
+        "arabizi": ["Wa 3likom salam! Labas 3lik?", "Ahlan! Kidayr lyouma?"],
+        "arabic": ["وعليكم السلام! لاباس عليك؟", "أهلا! كيداير اليوما؟"],
+        "en": ["Hello! How are you today?", "Hi there! How are you?"],
+    },
+    "how_are_you": {
+        "arabizi": ["Hamdullah, mzyan! W nta, kidayr?", "Labas, hamdullah. Ach bghiti t3llem lyouma?"],
+        "arabic": ["الحمد لله، مزيان! ونتا، كيداير؟", "لاباس، الحمد لله. أش بغيتي تعلم اليوما؟"],
+        "en": ["Glad to hear it! What would you like to practice?", "Great! What shall we learn today?"],
+    },
+    "thanks": {
+        "arabizi": ["Bla jmil!", "Hta haja, mrehba!"],
+        "arabic": ["بلا جميل!", "حتى حاجة، مرحبا!"],
+        "en": ["You're welcome!", "Any time!"],
+    },
+    "bye": {
+        "arabizi": ["Bslama! Nchoufk mn b3d.", "M3a salama, tsbah 3la khir!"],
+        "arabic": ["بسلامة! نشوفك من بعد.", "مع السلامة، تصبح على خير!"],
+        "en": ["Goodbye! See you next time.", "Bye, talk soon!"],
+    },
+}
+
+# Seed examples; lesson targets and lexicon entries are added on top in training_examples()
+SEEDS: Dict[str, List[str]] = {
+    "greet": ["salam", "slm", "salam 3likom", "salamo 3alaykom", "ahlan", "marhba", "sbah lkhir",
+              "msa lkhir", "hello", "hi", "hey", "good morning", "سلام", "السلام عليكم", "أهلا", "صباح الخير"],
+    "how_are_you": ["labas", "labas 3lik", "bikhir", "hamdullah", "ana labas", "ana bikhir hamdullah",
+                    "kolchi mzyan", "kidayr", "kidayra", "i'm fine", "i am good", "لاباس", "بخير", "الحمد لله"],
+    "thanks": ["shukran", "choukran", "chokran bzaf", "baraka llahu fik", "llah ykhlik", "merci",
+               "thanks", "thank you", "thank you so much", "شكرا", "شكرا بزاف", "بارك الله فيك"],
+    "bye": ["bslama", "beslama", "m3a salama", "tsbah 3la khir", "nchoufk mn b3d", "bye", "goodbye",
+            "see you", "بسلامة", "مع السلامة", "تصبح على خير"],
+    OTHER: ["how do i say bread", "translate water", "what does zwin mean", "bghit nmchi l souk",
+            "fin kayn lhotel", "chhal hada", "ana mn canada", "kifach ngoul thank you", "smiti sara",
+            "3afak 3tini lma", "i want to learn darija", "what is the word for tea", "wach kayn taxi",
+            "can you repeat that", "respond in english", "salam how do i say bread", "labas 3lik wach fhmti",
+            "thanks what does khobz mean", "bghit atay", "fin ghadi", "ana ghadi l dar", "chno hada",
+            "how are you in darija", "in english please", "tarjama dyal tomorrow", "ma fhmtch",
+            "عافاك عطيني الما", "شنو هادا", "فين كاين الطاكسي", "بغيت نتعلم الدارجة"],
+}
+
+def _words(text: str) -> List[str]:
+    return [w for w in (w.strip(".,!?;:\"'") for w in normalize(text).split()) if w]
+
+def _ngrams(text: str) -> List[str]:
+    """Character 2-4-grams of each word (padded with spaces), plus the whole word."""
+    feats = []
+    for w in _words(text):
+        feats.append("w=" + w)
+        p = f" {w} "
+        for n in (2, 3, 4):
+            feats.extend(p[i:i + n] for i in range(len(p) - n + 1))
+    return feats
+
+def training_examples(lessons_dir=LESSONS_DIR, lexicon_path=LEXICON_PATH,
+                      extra_other: Iterable[str] = ()) -> List[Tuple[str, str]]:
+    """(text, intent) pairs from SEEDS, lesson targets, the Darija lexicon and extra_other."""
+    out = [(t, label) for label, texts in SEEDS.items() for t in texts]
+    for path in sorted(glob.glob(os.path.join(str(lessons_dir), "*.json"))):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                lesson = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for turn in lesson.get("turns", []):
+            label = next((i for i in turn.get("intents", []) if i in REPLIES), OTHER)
+            out += [(t, label) for t in turn.get("targets", [])]
+    try:
+        with open(lexicon_path, "r", encoding="utf-8") as f:
+            lexicon = json.load(f)
+    except (OSError, ValueError):
+        lexicon = []
+    # single words are content ("khobz" wants a lesson, not a canned reply) unless the gloss says otherwise
+    for entry in lexicon if isinstance(lexicon, list) else []:
+        gloss = str(entry.get("gloss", "")).lower()
+        label = ("greet" if any(g in gloss for g in ("hello", "greeting")) else
+                 "thanks" if "thank" in gloss else
+                 "bye" if any(g in gloss for g in ("goodbye", "bye")) else OTHER)
+        out += [(entry[k], label) for k in ("arabizi", "arabic") if entry.get(k)]
+    out += [(t, OTHER) for t in extra_other if t]
+    return out
+
+class NgramClassifier:
+    """Multinomial logistic regression over sparse char n-grams, trained with SGD."""
+
+    def __init__(self):
+        self.labels: List[str] = []
+        self.w: Dict[str, Dict[str, float]] = {}
+        self.b: Dict[str, float] = {}
+
+    def fit(self, examples: Sequence[Tuple[str, str]], epochs: int = 30, lr: float = 2.0,
+            l2: float = 1e-4) -> "NgramClassifier":
+        self.labels = sorted({label for _, label in examples})
+        self.w = {label: {} for label in self.labels}
+        self.b = {label: 0.0 for label in self.labels}
+        data = [(feats, label) for feats, label in ((_ngrams(t), label) for t, label in examples) if feats]
+        rng = random.Random(0)  # fixed shuffle: the same lessons always give the same model
+        for epoch in range(epochs):
+            step = lr / (1 + epoch)
+            rng.shuffle(data)
+            for feats, label in data:
+                probs = self._probs(feats)
+                for lbl in self.labels:
+                    g = step * (probs[lbl] - (lbl == label))
+                    if abs(g) < 1e-9:
+                        continue
+                    wl = self.w[lbl]
+                    for f in feats:
+                        wl[f] = wl.get(f, 0.0) * (1 - step * l2) - g / len(feats)
+                    self.b[lbl] -= g / len(feats)
+        return self
+
+    def _probs(self, feats: List[str]) -> Dict[str, float]:
+        scores = {}
+        for lbl in self.labels:
+            wl = self.w[lbl]
+            scores[lbl] = self.b[lbl] + sum(wl.get(f, 0.0) for f in feats)
+        top = max(scores.values())
+        exp = {lbl: math.exp(s - top) for lbl, s in scores.items()}
+        z = sum(exp.values())
+        return {lbl: e / z for lbl, e in exp.items()}
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        feats = _ngrams(text)
+        if not feats or not self.labels:
+            return OTHER, 0.0
+        probs = self._probs(feats)
+        label = max(probs, key=probs.get)
+        return label, probs[label]
+
+class LocalTier:
+    """
+    Answers small talk (greetings, "labas", thanks, goodbyes) from REPLIES without
+    calling the LLM. Turns with a QUESTION_WORDS word never qualify; exact training
+    phrases answer directly; anything else needs the classifier at MIN_CONFIDENCE or
+    better and at most MAX_WORDS words.
+    """
+
+    def __init__(self, examples: Sequence[Tuple[str, str]]):
+        self.exact: Dict[str, str] = {}
+        for t, label in examples:
+            self.exact.setdefault(" ".join(_words(t)), label)
+        self.clf = NgramClassifier().fit(examples)
+        self._turns = {intent: itertools.count() for intent in REPLIES}
+        self.answered = self.passed = 0
+
+    def classify(self, text: str) -> Tuple[str, float]:
+        words = _words(text)
+        if not words or len(words) > MAX_WORDS or not QUESTION_WORDS.isdisjoint(words):
+            return OTHER, 0.0
+        key = " ".join(words)
+        label = self.exact.get(key)
+        if label is not None:
+            return label, 1.0
+        return self.clf.predict(text)
+
+    def reply(self, text: str, out_lang: str, output_script: Optional[str]) -> Optional[str]:
+        """The canned reply for a high-confidence trivial turn, else None (ask the LLM)."""
+        label, conf = self.classify(text)
+        if label not in REPLIES or conf < MIN_CONFIDENCE:
+            self.passed += 1
+            return None
+        self.answered += 1
+        options = REPLIES[label][(output_script or "arabizi") if out_lang == "ar" else "en"]
+        return options[next(self._turns[label]) % len(options)]
+
+_TIER: Optional[LocalTier] = None
+_TIER_LOCK = threading.Lock()
+_TIER_READY = threading.Event()
+_TRAINER: Optional[threading.Thread] = None
+_TRAINER_LOCK = threading.Lock()
+
+def get_local_tier(extra_other: Callable[[], Iterable[str]] = tuple, wait: bool = True) -> Optional[LocalTier]:
+    """
+    The process-wide local tier, or None when LLM_LOCAL_TIER is off. Trained on first
+    use, with extra_other() as extra non-small-talk examples. With wait=False a tier
+    that isn't trained yet gives None (and starts training in the background), so the
+    turn goes to the LLM instead of waiting a few hundred ms for the classifier.
+    """
+    global _TIER
+    if not LOCAL_TIER:
+        return None
+    if not wait and not _TIER_READY.is_set():
+        train_local_tier(extra_other)
+        return None
+    with _TIER_LOCK:
+        if _TIER is None:
+            _TIER = LocalTier(training_examples(extra_other=extra_other()))
+            _TIER_READY.set()
+        return _TIER
+
+def train_local_tier(extra_other: Callable[[], Iterable[str]] = tuple) -> None:
+    """Train the local tier on a background thread, unless it is off, trained or already training."""
+    global _TRAINER
+    with _TRAINER_LOCK:
+        if LOCAL_TIER and not _TIER_READY.is_set() and (_TRAINER is None or not _TRAINER.is_alive()):
+            _TRAINER = threading.Thread(target=get_local_tier, args=(extra_other,), daemon=True)
+            _TRAINER.start()
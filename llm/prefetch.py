@@ -0,0 +1,120 @@
+# llm/prefetch.py
+from __future__ import annotations
+import os
+import threading
+from typing import Callable, Optional, Sequence
+
+from rapidfuzz import fuzz
+
+from llm.cache import normalize_prompt
+
+PREFETCH = os.environ.get("LLM_PREFETCH", "on").lower() not in ("0", "off", "false", "no")
+# how close (rapidfuzz ratio, 0-100) the final transcript must be to the prefetched one
+MIN_SIMILARITY = float(os.environ.get("LLM_PREFETCH_MIN_SIMILARITY", "90"))
+
+class _Discarded(Exception):
+    """Raised from the token callback to abort a stream nobody will read."""
+
+class PrefetchJob:
+    """
+    One speculative route() call. Tokens are buffered until someone attach()es; the
+    attached callback first gets everything received so far, then the rest live.
+    """
+
+    def __init__(self, text: str, lang_in: str, want_script: str, topics: Sequence[str],
+                 route: Callable[..., str]):
+        self.text, self.lang_in, self.want_script = text, lang_in, want_script
+        self._cv = threading.Condition()
+        self._pieces = []
+        self._listener: Optional[Callable[[str], None]] = None
+        self._discarded = False
+        self.done = False
+        self.reply: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        threading.Thread(target=self._run, args=(route, tuple(topics or ())), daemon=True).start()
+
+    def _run(self, route, topics) -> None:
+        try:
+            reply = route(self.text, self.lang_in, self.want_script, topics=topics, on_token=self._on_token)
+            err = None
+        except _Discarded:
+            reply, err = None, None
+        except Exception as e:
+            reply, err = None, e
+        with self._cv:
+            self.reply, self.error, self.done = reply, err, True
+            self._cv.notify_all()
+
+    def _on_token(self, piece: str) -> None:
+        with self._cv:
+            if self._discarded:
+                raise _Discarded()
+            self._pieces.append(piece)
+            if self._listener is not None:
+                self._listener(piece)
+
+    def discard(self) -> None:
+        with self._cv:
+            self._discarded = True
+
+    def attach(self, on_token: Optional[Callable[[str], None]] = None) -> str:
+        """Stream this job's reply into on_token (replaying what already arrived) and wait for it."""
+        with self._cv:
+            if on_token is not None:
+                for piece in self._pieces:
+                    on_token(piece)
+                self._listener = on_token
+            while not self.done:
+                self._cv.wait()
+            if self.error is not None:
+                raise self.error
+            return self.reply or ""
+
+class Prefetcher:
+    """
+    Starts the tutor reply on a stable partial transcript while ASR finishes, and hands it
+    over if the final transcript turns out close enough (MIN_SIMILARITY); otherwise the
+    speculative reply is dropped and its stream aborted.
+    """
+
+    def __init__(self, route: Optional[Callable[..., str]] = None, min_similarity: float = MIN_SIMILARITY):
+        if route is None:
+            from llm.router import route
+        self.route = route
+        self.min_similarity = min_similarity
+        self._lock = threading.Lock()
+        self._job: Optional[PrefetchJob] = None
+        self.used = self.dropped = 0
+
+    def start(self, text: str, lang_in: str, want_script: str, topics: Sequence[str] = ()) -> None:
+        if not PREFETCH or not normalize_prompt(text):
+            return
+        with self._lock:
+            if self._job is not None:
+                if normalize_prompt(self._job.text) == normalize_prompt(text):
+                    return
+                self._job.discard()
+                self.dropped += 1
+            self._job = PrefetchJob(text, lang_in, want_script, topics, self.route)
+
+    def cancel(self) -> None:
+        """Drop the pending job, if any (the utterance ended without a usable transcript)."""
+        with self._lock:
+            job, self._job = self._job, None
+        if job is not None:
+            job.discard()
+            self.dropped += 1
+
+    def claim(self, final_text: str, lang_in: str, want_script: str) -> Optional[PrefetchJob]:
+        """The prefetched job if it answers final_text, else None (and the job is dropped)."""
+        with self._lock:
+            job, self._job = self._job, None
+        if job is None:
+            return None
+        score = fuzz.ratio(normalize_prompt(job.text), normalize_prompt(final_text))
+        if score >= self.min_similarity and (job.lang_in, job.want_script) == (lang_in, want_script):
+            self.used += 1
+            return job
+        job.discard()
+        self.dropped += 1
+        return None
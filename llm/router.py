@@ -1,10 +1,12 @@
 # llm/router.py
 from __future__ import annotations
-import json, re, pathlib
-from typing import Optional, Sequence, Tuple, Dict, Any
+import json, os, re, pathlib, threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
 
 import utils.arabizi as ar_utils
+from llm.local_tier import get_local_tier, train_local_tier
 from llm.tutor_client import ask_llm
+from utils.aho_corasick import AhoCorasick
 
 # Safe access to helpers you already expose
 _has_ar = getattr(ar_utils, "has_arabic_chars", lambda s: False)
@@ -32,19 +34,24 @@ _DEFAULT_LEX: Dict[str, Any] = {
     "arabizi_cues": ["salam","labas","kif","3lach","bghit","mazyan","wach","tarjama","inglizi","s7ab","3afak","chno"]
 }
 
-def _load_lex() -> Dict[str, Any]:
+def _read_lex() -> Optional[Dict[str, Any]]:
     try:
         with open(_LEX_PATH, "r", encoding="utf-8") as f:
             data = json.load(f)
-        out = _DEFAULT_LEX.copy()
-        out.update(data)
-        return out
+    except FileNotFoundError:
+        return None
+    out = _DEFAULT_LEX.copy()
+    out.update(data)
+    return out
+
+def _load_lex() -> Dict[str, Any]:
+    try:
+        return _read_lex() or _DEFAULT_LEX
     except Exception:
         return _DEFAULT_LEX
 
-LEX = _load_lex()
-ARABIZI_CUES = set(LEX.get("arabizi_cues", []))
 _ARABIZI_DIGITS = ("2", "3", "5", "6", "7", "9")
+_CUES = "arabizi_cues"
 
 def _guess_script(s: str) -> str:
     if _has_ar(s): return "arabic"
@@ -52,23 +59,161 @@ def _guess_script(s: str) -> str:
         return "arabizi"
     return "latin"
 
+try:
+    from re import _parser as _sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse as _sre_parse
+
+_META = set(".^$*+?{}[]\\|()")
+
+def _literal(p: str) -> Optional[Tuple[str, bool, bool]]:
+    """(text, boundary before, boundary after) if pattern p is plain text, optionally wrapped in \\b."""
+    left = p.startswith(r"\b")
+    right = p.endswith(r"\b") and len(p) > (3 if left else 1)
+    body = p[2 if left else 0:len(p) - 2 if right else len(p)]
+    if not body or any(c in _META for c in body):
+        return None
+    return body, left, right
+
+def _required_literal(p: str) -> str:
+    """The longest run of plain characters every match of p must contain ("" if unsure)."""
+    try:
+        parsed = _sre_parse.parse(p)
+    except Exception:
+        return ""
+    if parsed.state.flags & re.IGNORECASE:
+        return ""
+    best, run = "", []
+    for op, av in list(parsed) + [(None, None)]:
+        if op is _sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        if len(run) > len(best):
+            best = "".join(run)
+        run = []
+    return best
+
+def _is_word(text: str, i: int) -> bool:
+    return 0 <= i < len(text) and (text[i].isalnum() or text[i] == "_")
+
+class _Matcher:
+    """
+    LEX compiled for one pass per utterance. Keywords, cues and plain-text phrases
+    (the common "\\bsome words\\b" shape) go into one Aho-Corasick automaton, with
+    word boundaries checked on each hit. Every other phrase regex is keyed in the same
+    automaton by the longest literal it requires, so it only runs when that literal
+    shows up. Scores equal the old per-pattern re.search / `in` loop: 3 per phrase,
+    1 per keyword, cues counted under _CUES.
+    """
+
+    def __init__(self, lex: Dict[str, Any]):
+        literals = []
+        self._always: Dict[str, int] = {}            # empty keywords match everything
+        self._regexes: List[Tuple[str, Any]] = []     # (intent, compiled) confirmed by search()
+        self._unanchored: List[int] = []              # regexes with no literal to wait for
+        entries = [(intent, p, 3) for intent, spec in lex.items() if isinstance(spec, dict)
+                   for p in spec.get("phrases", [])]
+        for intent, spec in lex.items():
+            if isinstance(spec, dict):
+                entries += [(intent, kw, 1) for kw in spec.get("keywords", [])]
+        entries += [(_CUES, cue, 1) for cue in set(lex.get(_CUES, []))]
+        for n, (intent, entry, weight) in enumerate(entries):
+            if weight == 1:
+                if entry:
+                    literals.append((entry, (intent, 1, n, False, False)))
+                else:
+                    self._always[intent] = self._always.get(intent, 0) + 1
+                continue
+            try:
+                rx = re.compile(entry)
+            except re.error:
+                continue
+            lit = _literal(entry)
+            if lit is not None:
+                literals.append((lit[0], (intent, 3, n, lit[1], lit[2])))
+                continue
+            self._regexes.append((intent, rx))
+            anchor = _required_literal(entry)
+            if anchor:
+                literals.append((anchor, (intent, 0, len(self._regexes) - 1, False, False)))
+            else:
+                self._unanchored.append(len(self._regexes) - 1)
+        self._ac = AhoCorasick(literals)
+
+    def scores(self, text_low: str) -> Dict[str, int]:
+        out = dict(self._always)
+        seen, candidates = set(), set(self._unanchored)
+        for end, lit, (intent, weight, n, left, right) in self._ac.iter(text_low):
+            if weight == 0:
+                candidates.add(n)
+                continue
+            if n in seen:
+                continue
+            if left and _is_word(text_low, end - len(lit) - 1) == _is_word(text_low, end - len(lit)):
+                continue
+            if right and _is_word(text_low, end - 1) == _is_word(text_low, end):
+                continue
+            seen.add(n)
+            out[intent] = out.get(intent, 0) + weight
+        for i in candidates:
+            intent, rx = self._regexes[i]
+            if rx.search(text_low):
+                out[intent] = out.get(intent, 0) + 3
+        return out
+
+# LEX is recompiled whenever data/router_lex.json changes on disk (checked per call)
+LEX = _load_lex()
+ARABIZI_CUES = set(LEX.get(_CUES, []))
+_MATCHER = _Matcher(LEX)
+_LEX_MTIME: Optional[int] = None
+_LEX_LOCK = threading.Lock()
+
+def _lex_mtime() -> Optional[int]:
+    try:
+        return os.stat(_LEX_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+_LEX_MTIME = _lex_mtime()
+
+def _matcher() -> _Matcher:
+    global LEX, ARABIZI_CUES, _MATCHER, _LEX_MTIME
+    mtime = _lex_mtime()
+    if mtime == _LEX_MTIME:
+        return _MATCHER
+    with _LEX_LOCK:
+        if mtime != _LEX_MTIME:
+            try:
+                lex = _read_lex() or _DEFAULT_LEX
+                LEX, ARABIZI_CUES, _MATCHER = lex, set(lex.get(_CUES, [])), _Matcher(lex)
+            except Exception as e:
+                # a half-saved edit: keep the last good lexicon until the file changes again
+                print(f"[router] could not reload {_LEX_PATH}: {e}")
+            _LEX_MTIME = mtime
+        return _MATCHER
+
 def _score(intent: str, text_low: str) -> int:
-    spec = LEX.get(intent, {})
-    conf = 0
-    for p in spec.get("phrases", []):
-        try:
-            if re.search(p, text_low): conf += 3
-        except re.error:
-            pass
-    for kw in spec.get("keywords", []):
-        if kw in text_low: conf += 1
-    return conf
+    return _matcher().scores(text_low).get(intent, 0)
+
+def _routing_examples() -> List[str]:
+    """Keywords and plain-text phrases of the routing intents: never small talk, whatever they contain."""
+    out = []
+    for spec in LEX.values():
+        if isinstance(spec, dict):
+            out += spec.get("keywords", [])
+            out += [lit[0] for lit in map(_literal, spec.get("phrases", [])) if lit]
+    return out
+
+def warm_up() -> None:
+    """Start training the small-talk classifier in the background, ahead of the first turn."""
+    train_local_tier(_routing_examples)
 
 def _decide_mode(text_low: str, lang_in: str) -> Tuple[str, str]:
-    force_dar = _score("force_darija", text_low)
-    force_en  = _score("force_english", text_low)
-    en2ar     = _score("translate_en_to_ar", text_low)
-    ar2en     = _score("translate_ar_to_en", text_low)
+    scores = _matcher().scores(text_low)
+    force_dar = scores.get("force_darija", 0)
+    force_en  = scores.get("force_english", 0)
+    en2ar     = scores.get("translate_en_to_ar", 0)
+    ar2en     = scores.get("translate_ar_to_en", 0)
 
     if force_dar >= 3: return "normal", "ar"
     if force_en  >= 3: return "normal", "en"
@@ -76,7 +221,7 @@ def _decide_mode(text_low: str, lang_in: str) -> Tuple[str, str]:
     if lang_in == "ar": ar2en += 1
     else:               en2ar += 1
 
-    if any(w in text_low for w in ARABIZI_CUES): en2ar += 1
+    if scores.get(_CUES): en2ar += 1
 
     if max(en2ar, ar2en) >= 3:
         if en2ar > ar2en: return "translate_en_to_ar", "ar"
@@ -91,6 +236,7 @@ def route(
     lang_in: str,
     want_script: str,                     # "arabizi" | "arabic"
     topics: Optional[Sequence[str]] = (), # list or tuple
+    on_token: Optional[Callable[[str], None]] = None,  # streamed reply pieces
 ) -> str:
     s_raw = text or ""
     s = _norm_mishears(s_raw).strip()
@@ -110,10 +256,21 @@ def route(
     else:
         output_script = None
 
+    # Small talk ("salam", "labas", "shukran") gets a canned reply without an LLM round-trip
+    if mode == "normal":
+        # not trained yet (see warm_up) -> this turn goes to the LLM rather than wait for it
+        tier = get_local_tier(_routing_examples, wait=False)
+        reply = tier.reply(s, out_lang, output_script) if tier is not None else None
+        if reply is not None:
+            if on_token is not None:
+                on_token(reply)
+            return reply
+
     return ask_llm(
         s,
         out_lang,
         mode=mode,
         output_script=output_script,
         topics=topics_tuple,
+        on_token=on_token,
     )
\ No newline at end of file
@@ -1,10 +1,15 @@
 # llm/tutor_client.py
+import json
 import os
+import threading
 import time
 import requests
-from typing import List, Optional, Tuple
+from requests.adapters import HTTPAdapter
+from typing import Callable, List, Optional, Tuple
 
-from utils.arabizi import arabic_to_arabizi, has_arabic_chars
+from llm.backends import BackendPool, LLMBackend
+from llm.cache import cache_key, get_cache
+from utils.arabizi import arabic_to_arabizi, has_arabic_chars, transliterate_piece
 
 try:
     from dotenv import load_dotenv
@@ -20,26 +25,85 @@ TIMEOUT_SEC      = float(os.environ.get("TUTOR_TIMEOUT", "12.0"))
 MAX_RETRIES      = int(os.environ.get("LLM_MAX_RETRIES", "3"))
 BACKOFF_BASE     = float(os.environ.get("LLM_BACKOFF_BASE", "0.8"))
 MAX_TOKENS       = int(os.environ.get("LLM_MAX_TOKENS", "160"))
+POOL_SIZE        = int(os.environ.get("LLM_POOL_SIZE", "4"))
+# Wall-clock budget for one request including retries and backoff sleeps
+DEADLINE_SEC     = float(os.environ.get("LLM_DEADLINE_SEC", "20.0"))
 
-def _post_with_retries(url: str, *, headers: dict, json: dict) -> requests.Response:
+# One keep-alive session for every call, so only the first reply pays for TCP+TLS setup
+_SESSION: Optional[requests.Session] = None
+_SESSION_LOCK = threading.Lock()
+
+def _session() -> requests.Session:
+    global _SESSION
+    with _SESSION_LOCK:
+        if _SESSION is None:
+            s = requests.Session()
+            adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            _SESSION = s
+        return _SESSION
+
+def warm_up() -> None:
+    """Open the pooled connection ahead of the first reply (call from a background thread)."""
+    url = TUTOR_API_URL or OPENAI_API_BASE
+    try:
+        _session().head(url, timeout=TIMEOUT_SEC)
+    except requests.RequestException:
+        pass
+
+def _post_with_retries(url: str, *, headers: dict, json: dict, stream: bool = False) -> requests.Response:
+    deadline = time.monotonic() + DEADLINE_SEC
     last_err = None
     for attempt in range(MAX_RETRIES + 1):
+        left = deadline - time.monotonic()
+        if left <= 0:
+            break
         try:
-            r = requests.post(url, headers=headers, json=json, timeout=TIMEOUT_SEC)
+            r = _session().post(url, headers=headers, json=json, timeout=min(TIMEOUT_SEC, left), stream=stream)
             if r.status_code in (429, 503):
                 ra = r.headers.get("Retry-After")
                 delay = float(ra) if ra else BACKOFF_BASE * (2 ** attempt)
-                time.sleep(min(delay, 8.0))
                 last_err = requests.HTTPError(f"{r.status_code} {r.reason}")
+                r.close()
+                if delay >= deadline - time.monotonic():
+                    break  # the server wants us back after the deadline: give up now
+                time.sleep(min(delay, 8.0))
                 continue
             r.raise_for_status()
             return r
         except requests.RequestException as e:
             last_err = e
-            time.sleep(BACKOFF_BASE * (2 ** attempt))
-    raise last_err if last_err else RuntimeError("LLM request failed")
+            time.sleep(max(0.0, min(BACKOFF_BASE * (2 ** attempt), deadline - time.monotonic())))
+    raise last_err if last_err else requests.Timeout(f"LLM request exceeded {DEADLINE_SEC:.0f}s")
 
-def _openai_chat(messages: List[dict]) -> str:
+def _iter_sse_deltas(r: requests.Response):
+    """Content pieces of a streamed chat/completions response (server-sent events)."""
+    with r:
+        # SSE is UTF-8 by spec; without a charset requests would decode it as ISO-8859-1
+        r.encoding = "utf-8"
+        # read to the end of the body even after [DONE], so the connection goes back to the pool
+        done = False
+        for line in r.iter_lines(decode_unicode=True):
+            if done or not line or not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                done = True
+                continue
+            try:
+                choice = json.loads(data)["choices"][0]
+            except (ValueError, KeyError, IndexError):
+                continue
+            piece = (choice.get("delta") or {}).get("content")
+            if piece:
+                yield piece
+
+def _openai_chat(messages: List[dict], on_token: Optional[Callable[[str], None]] = None) -> str:
+    """
+    One chat completion. With on_token, the reply is streamed and on_token gets each
+    piece as it arrives; the full text is returned either way.
+    """
     key = os.environ.get("OPENAI_API_KEY")
     if not key:
         raise RuntimeError("OPENAI_API_KEY not set")
@@ -50,9 +114,19 @@ def _openai_chat(messages: List[dict]) -> str:
         "temperature": 0.2,
         "max_tokens": MAX_TOKENS,
     }
-    r = _post_with_retries(url, headers={"Authorization": f"Bearer {key}"}, json=body)
-    data = r.json()
-    return data["choices"][0]["message"]["content"].strip()
+    headers = {"Authorization": f"Bearer {key}"}
+    if on_token is None:
+        r = _post_with_retries(url, headers=headers, json=body)
+        data = r.json()
+        return data["choices"][0]["message"]["content"].strip()
+
+    body["stream"] = True
+    r = _post_with_retries(url, headers=headers, json=body, stream=True)
+    pieces = []
+    for piece in _iter_sse_deltas(r):
+        pieces.append(piece)
+        on_token(piece)
+    return "".join(pieces).strip()
 
 def _custom_rest_tutor(prompt: str, lang: str) -> str:
     # Fine-tune hook: point this at your Darija-specific responder if/when you host it.
@@ -67,12 +141,39 @@ def _custom_rest_tutor(prompt: str, lang: str) -> str:
     data = r.json()
     return (data.get("text") or "").strip()
 
+_POOL: Optional[BackendPool] = None
+_POOL_LOCK = threading.Lock()
+
+def _pool() -> BackendPool:
+    """
+    The configured reply backends, self-hosted tutor first. Each keeps its own p95 and
+    circuit breaker, so a slow or failing provider is hedged around or skipped.
+    """
+    global _POOL
+    with _POOL_LOCK:
+        if _POOL is None:
+            backends = []
+            if TUTOR_API_URL:
+                def _tutor_api(transcript, lang, messages, on_token=None):
+                    out = _custom_rest_tutor(transcript, lang)
+                    if on_token is not None and out:
+                        on_token(out)
+                    return out
+                backends.append(LLMBackend("tutor-api", _tutor_api))
+            # without any backend configured, keep OpenAI so its missing-key error surfaces
+            if os.environ.get("OPENAI_API_KEY") or not backends:
+                backends.append(LLMBackend("openai", lambda transcript, lang, messages, on_token=None:
+                                           _openai_chat(messages, on_token)))
+            _POOL = BackendPool(backends)
+        return _POOL
+
 def ask_llm(
     transcript: str,
     lang_hint: Optional[str],             # 'en' or 'ar'
     mode: str = "normal",                 # "normal", "translate_en_to_ar", "translate_ar_to_en"
     output_script: Optional[str] = None,  # "arabizi", "arabic" when lang_hint =="ar"
     topics: Optional[Tuple[str, ...]] = None,
+    on_token: Optional[Callable[[str], None]] = None,
 ) -> str:
     """
     mode:
@@ -81,15 +182,44 @@ def ask_llm(
       - "translate_ar_to_en" -> English meaning
     output_script when lang_hint == "ar": "arabizi" | "arabic" | None
     topics: last few learner interests/themes to bias examples (tuple for safety)
+    on_token: called with each piece of the reply as it streams in (the self-hosted
+              tutor sends it in one piece); the returned string is the final, cleaned-up reply
     """
     lang = (lang_hint or "en").lower()
     out_script = (output_script or "arabizi").lower() if lang == "ar" else None
     topics_line = ", ".join(list(topics or ())[-10:]) if topics else ""
 
-    # If you deploy your own fine-tuned responder, it plugs in here:
-    if TUTOR_API_URL:
-        return _custom_rest_tutor(transcript, lang)
+    # Repeated lesson phrases get the reply they got last time, without a network call.
+    # Replies are keyed on the backend that wrote them: a failover or hedged OpenAI
+    # reply must not be served later as if the tutor API had given it.
+    cache = get_cache()
+    def _key(backend: str) -> str:
+        return cache_key(transcript, lang, mode, out_script, list(topics or ())[-10:],
+                         _backend_id(backend))
+    pool = _pool()
+    if cache is not None:
+        hit = cache.get(_key(pool.backends[0].name))
+        if hit is not None:
+            if on_token is not None:
+                on_token(hit)
+            return hit
+
+    answered = []
+    out = _ask_uncached(transcript, lang, mode, out_script, topics_line, on_token,
+                        on_winner=lambda b: answered.append(b.name))
+    if cache is not None and out and answered:
+        cache.put(_key(answered[0]), out)
+    return out
+
+def _backend_id(name: str) -> str:
+    """What a cached reply from backend `name` depends on, for the cache key."""
+    if name == "tutor-api":
+        return TUTOR_API_URL
+    return f"{OPENAI_API_BASE}|{OPENAI_MODEL}|{MAX_TOKENS}"
 
+def _ask_uncached(transcript: str, lang: str, mode: str, out_script: Optional[str],
+                  topics_line: str, on_token: Optional[Callable[[str], None]],
+                  on_winner: Optional[Callable[[LLMBackend], None]] = None) -> str:
     # Build a compact Darija-first prompt
     if mode == "translate_en_to_ar":
         if out_script == "arabic":
@@ -137,7 +267,11 @@ def ask_llm(
         {"role": "system", "content": system},
         {"role": "user", "content": transcript.strip()},
     ]
-    out = _openai_chat(messages)
+    if on_token is not None and lang == "ar" and out_script == "arabizi":
+        raw_token = on_token
+        on_token = lambda piece: raw_token(transliterate_piece(piece) if has_arabic_chars(piece) else piece)
+    # Your own fine-tuned responder (TUTOR_API_URL) and/or OpenAI, hedged against each other
+    out = _pool().call(transcript, lang, messages, on_token=on_token, on_winner=on_winner)
 
     # Safety: if Arabizi requested but model emits Arabic letters, convert to Arabizi
     if lang == "ar" and out_script == "arabizi" and has_arabic_chars(out):
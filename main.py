@@ -1,25 +1,25 @@
-import json
 import threading
 import time
 import PySimpleGUI as sg
-from faster_whisper import WhisperModel
 
+from asr.backends import ENGINE, load_backend
 from utils.audio_io import record_until_silence
+from utils.lessons import load_lessons
 from utils.score import score_turn
 
 ## Load lesson
-with open("lessons/greetings.json", "r", encoding="utf-8") as f:
-    LESSON = json.load(f)
+LESSON = load_lessons().lesson("greetings")  # compiled bundle: targets already indexed
 
 ## Load Whisper model (first run downloads weights). "small" is a good compromise.
-ASR = WhisperModel("small", compute_type="int8")
+## faster-whisper int8 unless ASR_ENGINE picks another engine.
+ASR = load_backend(ENGINE or "faster-whisper", "small", "int8")
 
 running_flag = False
 
 
 def tutor_loop(window: sg.Window) -> None:
     global running_flag
-    turns = LESSON.get("turns", [])
+    turns = LESSON.turns
     for idx, turn in enumerate(turns):
         if not running_flag:
             break
@@ -34,8 +34,7 @@ def tutor_loop(window: sg.Window) -> None:
         audio = record_until_silence()
 
         # transcribe
-        segments, info = ASR.transcribe(audio, language="ar")
-        text = " ".join(s.text for s in segments).strip()
+        text = ASR.transcribe(audio, "ar") if len(audio) else ""
 
         # score
         result = score_turn(text, turn)
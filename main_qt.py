@@ -1,5 +1,4 @@
 # main_qt.py
-import json
 import threading
 import time
 import sys
@@ -11,16 +10,16 @@ from PySide6.QtWidgets import (
 from PySide6.QtGui import QFont
 from PySide6.QtCore import Qt
 
-from faster_whisper import WhisperModel
+from asr.backends import ENGINE, load_backend
 from utils.audio_io import record_until_silence
+from utils.lessons import load_lessons
 from utils.score import score_turn
 
 # Load lesson
-with open("lessons/greetings.json", "r", encoding="utf-8") as f:
-    LESSON = json.load(f)
+LESSON = load_lessons().lesson("greetings")  # compiled bundle: targets already indexed
 
-# Load Whisper model
-ASR = WhisperModel("small", compute_type="int8")
+# Load Whisper model (faster-whisper int8 unless ASR_ENGINE picks another engine)
+ASR = load_backend(ENGINE or "faster-whisper", "small", "int8")
 
 running_flag = False
 
@@ -79,7 +78,7 @@ class TutorWindow(QWidget):
 
     def tutor_loop(self):
         global running_flag
-        turns = LESSON.get("turns", [])
+        turns = LESSON.turns
         for idx, turn in enumerate(turns):
             if not running_flag:
                 break
@@ -91,8 +90,7 @@ class TutorWindow(QWidget):
             t0 = time.time()
             audio = record_until_silence()
 
-            segments, info = ASR.transcribe(audio, language="ar")
-            text = " ".join(s.text for s in segments).strip()
+            text = ASR.transcribe(audio, "ar") if len(audio) else ""
 
             result = score_turn(text, turn)
             latency_ms = int((time.time() - t0) * 1000)
@@ -0,0 +1,77 @@
+# scripts/bench_arabizi.py
+"""
+Arabic -> Arabizi: the old per-character loop vs the str.translate table, one reply and a dataset.
+
+    python -m scripts.bench_arabizi
+    python -m scripts.bench_arabizi --dataset 120000 --processes 1 4 8
+
+"gui" times one tutor-length reply (what the streaming Arabizi conversion does
+per token and per reply); "dataset" times --dataset assistant turns the way
+ft/prepare_dataset.py does, through transliterate_batch with each --processes.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import time
+
+from utils.arabizi import _DIAC, _MAP, _TATWEEL, arabic_to_arabizi, transliterate_batch
+
+_WORDS = ("السلام عليكم لاباس عليك الحمد لله بخير شكرا بزاف فين كاين السوق بغيت نشري الخبز "
+          "واش كاين أتاي مزيان بسلامة نشوفك من بعد كيداير اليوما عافاك عطيني الما").split()
+
+
+def _old(text: str) -> str:
+    # utils.arabizi.arabic_to_arabizi before the translate table
+    if not text: return ""
+    s = _DIAC.sub("", text.replace(_TATWEEL, ""))
+    s = s.replace("لا", "la")
+    out = []
+    i = 0
+    while i < len(s):
+        out.append(_MAP.get(s[i], s[i]))
+        i += 1
+    return re.sub(r"\s+", " ", "".join(out)).strip()
+
+
+def _sentence(rng: random.Random) -> str:
+    return " ".join(rng.choice(_WORDS) for _ in range(rng.randint(6, 25))) + "."
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--dataset", type=int, default=100000, help="strings in the dataset case")
+    ap.add_argument("--processes", nargs="+", type=int, default=[1, os.cpu_count() or 1])
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    reply = _sentence(rng)
+    reps = 20000
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        _old(reply)
+    t_old = (time.perf_counter() - t0) / reps * 1e6
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        arabic_to_arabizi(reply)
+    t_new = (time.perf_counter() - t0) / reps * 1e6
+    assert _old(reply) == arabic_to_arabizi(reply)
+    print(f"gui      one {len(reply)}-char reply: old {t_old:.1f} us, table {t_new:.1f} us ({t_old / t_new:.1f}x)")
+
+    texts = [_sentence(rng) for _ in range(args.dataset)]
+    t0 = time.perf_counter()
+    expected = [_old(t) for t in texts]
+    t_old = time.perf_counter() - t0
+    print(f"dataset  {len(texts)} strings: old loop {t_old:.2f} s")
+    for p in dict.fromkeys(args.processes):
+        t0 = time.perf_counter()
+        got = transliterate_batch(texts, processes=p)
+        dt = time.perf_counter() - t0
+        assert got == expected, "translate table disagrees with the old loop"
+        print(f"         transliterate_batch processes={p}: {dt:.2f} s ({t_old / dt:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# scripts/bench_decode_cache.py
+"""
+Per-token Whisper decode latency on CPU with the decoder KV cache on and off.
+
+    python -m scripts.bench_decode_cache
+    python -m scripts.bench_decode_cache --models openai/whisper-small --tokens 32 64 128
+
+The encoder runs once per model and both modes decode from the same encoder
+output, so the numbers isolate the decoder. Generation is pinned to exactly N
+new tokens; without the cache the per-token cost grows with N.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+import torch
+from transformers import WhisperProcessor, WhisperForConditionalGeneration
+from transformers.utils import logging as hf_logging
+
+from asr.decoder import TARGET_SR
+
+hf_logging.set_verbosity_error()
+
+
+def _time_decode(model, enc, n_tokens: int, use_cache: bool, repeats: int) -> float:
+    runs = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        with torch.no_grad():
+            model.generate(
+                encoder_outputs=enc,
+                min_new_tokens=n_tokens,
+                max_new_tokens=n_tokens,
+                do_sample=False,
+                use_cache=use_cache,
+            )
+        runs.append(time.perf_counter() - t0)
+    return statistics.median(runs) / n_tokens
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--models", nargs="+", default=["openai/whisper-small", "openai/whisper-medium"])
+    ap.add_argument("--tokens", nargs="+", type=int, default=[16, 64, 128])
+    ap.add_argument("--seconds", type=float, default=5.0, help="length of the synthetic clip")
+    ap.add_argument("--repeats", type=int, default=3)
+    ap.add_argument("--threads", type=int, default=0, help="torch CPU threads (0 = torch default)")
+    args = ap.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    rng = np.random.default_rng(0)
+    audio = (0.05 * rng.standard_normal(int(args.seconds * TARGET_SR))).astype(np.float32)
+
+    print(f"[bench_decode_cache] cpu threads={torch.get_num_threads()} clip={args.seconds:.1f}s")
+    print(f"{'model':<28}{'tokens':>8}{'cache on ms/tok':>18}{'cache off ms/tok':>18}{'speedup':>10}")
+    for repo in args.models:
+        processor = WhisperProcessor.from_pretrained(repo)
+        model = WhisperForConditionalGeneration.from_pretrained(repo, torch_dtype=torch.float32).eval()
+        model.generation_config.forced_decoder_ids = None
+
+        feats = processor(audio, sampling_rate=TARGET_SR, return_tensors="pt").input_features
+        with torch.no_grad():
+            enc = model.get_encoder()(feats, return_dict=True)
+
+        # warm-up so the first timed run doesn't pay for lazy init
+        _time_decode(model, enc, 4, True, 1)
+
+        for n in args.tokens:
+            on = _time_decode(model, enc, n, True, args.repeats)
+            off = _time_decode(model, enc, n, False, args.repeats)
+            print(f"{repo:<28}{n:>8}{on * 1000:>18.1f}{off * 1000:>18.1f}{off / on:>9.1f}x")
+
+        del model
+
+
+if __name__ == "__main__":
+    main()
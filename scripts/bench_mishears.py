@@ -0,0 +1,75 @@
+# scripts/bench_mishears.py
+"""
+Mishear normalization: the old per-variant re.compile/sub loop vs utils.arabizi's compiled trie regex.
+
+    python -m scripts.bench_mishears
+    python -m scripts.bench_mishears --variants 1000 5000 20000
+
+Synthetic {canonical: [variants]} tables of the given total size, applied to
+ASR-length utterances. Also shows a flat longest-first alternation, which the
+trie replaces, and checks that it and the trie produce the same text.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+
+from utils.arabizi import compile_mishears
+
+_SYLLABLES = ("la bas kul chi sa lam the feel cool bi khir wa ch kif ash ham dul lah "
+              "sh ukr an b sla ma fin ka yen daba bzaf smi ti mz yan").split()
+
+
+def _table(n: int, rng: random.Random) -> dict:
+    table = {}
+    for i in range(0, n, 4):
+        table[f"canon{i}"] = [" ".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(2, 4)))
+                              for _ in range(4)]
+    return table
+
+
+def _old(table: dict, text: str) -> str:
+    # utils.arabizi.normalize_mishears before the compiled matcher
+    s = text
+    for canonical, variants in table.items():
+        for v in variants:
+            s = re.compile(re.escape(v), re.IGNORECASE).sub(canonical, s)
+    return s
+
+
+def _per_call(fn, texts, reps: int) -> float:
+    t0 = time.perf_counter()
+    for _ in range(reps):
+        for t in texts:
+            fn(t)
+    return (time.perf_counter() - t0) / (reps * len(texts)) * 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--variants", nargs="+", type=int, default=[100, 1000, 5000, 20000])
+    ap.add_argument("--utterances", type=int, default=50)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    texts = [" ".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(4, 14))) for _ in range(args.utterances)]
+    print(f"{'variants':>9}{'build ms':>10}{'old us':>10}{'flat alt us':>13}{'trie us':>9}{'speedup':>9}")
+    for n in args.variants:
+        table = _table(n, rng)
+        t0 = time.perf_counter()
+        rx, lookup = compile_mishears(table)
+        build = (time.perf_counter() - t0) * 1000
+        flat = re.compile("|".join(map(re.escape, sorted(lookup, key=len, reverse=True))), re.IGNORECASE)
+        sub = lambda m: lookup[m.group(0).lower()]
+
+        t_old = _per_call(lambda t: _old(table, t), texts[:max(3, 2000 // n)], 1)
+        t_flat = _per_call(lambda t: flat.sub(sub, t), texts, 3)
+        t_trie = _per_call(lambda t: rx.sub(sub, t), texts, 20)
+        assert all(flat.sub(sub, t) == rx.sub(sub, t) for t in texts), "trie disagrees with the flat alternation"
+        print(f"{n:>9}{build:>10.1f}{t_old:>10.0f}{t_flat:>13.0f}{t_trie:>9.1f}{t_old / t_trie:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# scripts/bench_precision.py
+"""
+Accuracy and latency of the fp32 / bf16 / int8 Whisper modes on recorded lesson targets.
+
+    python -m scripts.bench_precision --audio-dir recordings/
+    python -m scripts.bench_precision --audio-dir recordings/ --model openai/whisper-medium --precisions fp32 int8
+
+See scripts/lesson_clips.py for how recordings are named. The first run of a
+bf16/int8 mode converts and caches the weights; the load column shows that cost,
+rerun to see the cached load time.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+import torch
+from transformers.utils import logging as hf_logging
+
+from asr.backends import load_backend
+from asr.precision import PRECISIONS
+from scripts.lesson_clips import iter_lesson_clips
+from utils.arabizi import arabic_to_arabizi
+from utils.score import word_error_rate
+
+hf_logging.set_verbosity_error()
+
+
+def _wer(text: str, target: str) -> float:
+    # Darija checkpoints answer in Arabic script; Arabizi targets are compared after transliteration
+    return min(word_error_rate(text, target), word_error_rate(arabic_to_arabizi(text), target))
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--audio-dir", required=True)
+    ap.add_argument("--lessons-dir", default="lessons")
+    ap.add_argument("--model", default="openai/whisper-small")
+    ap.add_argument("--precisions", nargs="+", default=list(PRECISIONS), choices=PRECISIONS)
+    ap.add_argument("--lang", default="ar")
+    ap.add_argument("--threads", type=int, default=0, help="torch CPU threads (0 = torch default)")
+    args = ap.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    clips = list(iter_lesson_clips(args.audio_dir, args.lessons_dir))
+    if not clips:
+        raise SystemExit(f"no recordings of lesson targets found in {args.audio_dir}")
+    print(f"[bench_precision] {args.model} on {len(clips)} clips, cpu threads={torch.get_num_threads()}")
+
+    print(f"{'precision':<10}{'load s':>8}{'size MB':>9}{'WER':>7}{'mean ms':>9}{'p95 ms':>8}")
+    for precision in args.precisions:
+        t0 = time.perf_counter()
+        backend = load_backend("transformers", args.model, precision)
+        load_s = time.perf_counter() - t0
+
+        backend.transcribe(clips[0][2], args.lang)  # warm-up
+        lat, wers = [], []
+        for target, _, audio in clips:
+            t0 = time.perf_counter()
+            text = backend.transcribe(audio, args.lang)
+            lat.append((time.perf_counter() - t0) * 1000)
+            wers.append(_wer(text, target))
+
+        lat.sort()
+        p95 = lat[min(len(lat) - 1, int(0.95 * len(lat)))]
+        print(f"{precision:<10}{load_s:>8.1f}{backend.nbytes() / 2**20:>9.0f}"
+              f"{statistics.mean(wers):>7.2f}{statistics.mean(lat):>9.0f}{p95:>8.0f}")
+        del backend
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# scripts/bench_resample.py
+"""
+Mic-block resampling: the old torch F.interpolate(linear) path vs asr.resample.
+
+    python -m scripts.bench_resample
+    python -m scripts.bench_resample --rates 44100 48000 --blocks 512 1024 4800
+
+Reports time per block, realtime factor over 30 s of audio, and how much of a
+tone above 8 kHz folds back into the 16 kHz output (lower is better).
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+from asr.decoder import TARGET_SR
+from asr.resample import PolyphaseResampler
+
+
+def _interp_block(block: np.ndarray, sr_in: int) -> np.ndarray:
+    # the pre-resampler run_decode path, including its extra copy
+    x = block.astype(np.float32).squeeze()
+    t = torch.from_numpy(x)[None, None, :].to(torch.float32)
+    t = F.interpolate(t, size=int(len(x) * TARGET_SR / max(1, sr_in)),
+                      mode="linear", align_corners=False)
+    return t[0, 0].cpu().numpy().copy()
+
+
+def _run_interp(blocks, sr_in):
+    return np.concatenate([_interp_block(b, sr_in) for b in blocks])
+
+
+def _run_polyphase(blocks, sr_in):
+    rs = PolyphaseResampler(sr_in, TARGET_SR)
+    out = np.empty(sum(rs.max_out(len(b)) for b in blocks), dtype=np.float32)
+    n = 0
+    for b in blocks:
+        n += len(rs.process(b[:, 0], out=out[n:n + rs.max_out(len(b))]))
+    return out[:n]
+
+
+def _alias_db(fn, sr_in: int, block: int) -> float:
+    # a 9.5 kHz tone has no place in 16 kHz audio; whatever survives is aliasing
+    t = np.arange(sr_in * 2) / sr_in
+    x = (0.5 * np.sin(2 * np.pi * 9500 * t)).astype(np.float32)[:, None]
+    y = fn([x[i:i + block] for i in range(0, len(x), block)], sr_in)[TARGET_SR // 4:-TARGET_SR // 4]
+    return 20 * np.log10(np.sqrt(np.mean(y ** 2)) / (0.5 / np.sqrt(2)) + 1e-12)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--rates", nargs="+", type=int, default=[44100, 48000])
+    ap.add_argument("--blocks", nargs="+", type=int, default=[512, 1024, 4800])
+    ap.add_argument("--seconds", type=float, default=30.0)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'rate':>6}{'block':>7}{'interp us/blk':>15}{'poly us/blk':>13}{'interp xRT':>12}"
+          f"{'poly xRT':>10}{'interp alias dB':>17}{'poly alias dB':>15}")
+    for sr in args.rates:
+        audio = (0.1 * rng.standard_normal((int(args.seconds * sr), 1))).astype(np.float32)
+        for bs in args.blocks:
+            blocks = [audio[i:i + bs] for i in range(0, len(audio), bs)]
+            res = {}
+            for name, fn in (("interp", _run_interp), ("poly", _run_polyphase)):
+                fn(blocks[:20], sr)  # warm-up
+                t0 = time.perf_counter()
+                fn(blocks, sr)
+                dt = time.perf_counter() - t0
+                res[name] = (dt / len(blocks) * 1e6, args.seconds / dt, _alias_db(fn, sr, bs))
+            print(f"{sr:>6}{bs:>7}{res['interp'][0]:>15.1f}{res['poly'][0]:>13.1f}{res['interp'][1]:>12.0f}"
+                  f"{res['poly'][1]:>10.0f}{res['interp'][2]:>17.1f}{res['poly'][2]:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
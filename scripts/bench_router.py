@@ -0,0 +1,87 @@
+# scripts/bench_router.py
+"""
+Router intent scoring: the old per-pattern re.search / `in` loop vs the compiled llm.router matcher.
+
+    python -m scripts.bench_router
+    python -m scripts.bench_router --entries 1000 10000 --regex-share 0.1
+
+Synthetic lexicons of N phrases + N keywords spread over the four intents, a
+--regex-share of the phrases being real regexes (the rest "\\bplain words\\b").
+Reports build time, time per utterance for both paths, and checks the scores agree.
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import re
+import time
+
+from llm.router import _DEFAULT_LEX, _Matcher
+
+_INTENTS = ("translate_en_to_ar", "translate_ar_to_en", "force_darija", "force_english")
+_WORDS = ("salam labas kif 3lach bghit mazyan wach tarjama inglizi s7ab 3afak chno how do i say "
+          "translate darija for in english respond reply speak moroccan arabic bread water tea "
+          "market taxi hotel friend family morning night today tomorrow please thanks").split()
+
+
+def _lexicon(n: int, regex_share: float, rng: random.Random) -> dict:
+    lex = {k: {"phrases": list(v.get("phrases", [])), "keywords": list(v.get("keywords", []))}
+           for k, v in _DEFAULT_LEX.items() if isinstance(v, dict)}
+    lex["arabizi_cues"] = list(_DEFAULT_LEX["arabizi_cues"])
+    for i in range(n):
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(2, 4))] + [f"w{i}"]
+        rng.shuffle(words)
+        if rng.random() < regex_share:
+            words[rng.randrange(len(words))] = f"({rng.choice(_WORDS)}|{rng.choice(_WORDS)})"
+        lex[_INTENTS[i % 4]]["phrases"].append(r"\b" + " ".join(words) + r"\b")
+        lex[_INTENTS[i % 4]]["keywords"].append(f"{rng.choice(_WORDS)}{i}")
+    return lex
+
+
+def _old_scores(lex: dict, text_low: str) -> dict:
+    # llm.router._score before the compiled matcher, once per intent
+    out = {}
+    for intent in _INTENTS:
+        conf = 0
+        for p in lex[intent]["phrases"]:
+            if re.search(p, text_low): conf += 3
+        for kw in lex[intent]["keywords"]:
+            if kw in text_low: conf += 1
+        out[intent] = conf
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--entries", nargs="+", type=int, default=[100, 1000, 10000])
+    ap.add_argument("--regex-share", type=float, default=0.1)
+    ap.add_argument("--utterances", type=int, default=200)
+    args = ap.parse_args()
+
+    rng = random.Random(0)
+    texts = [" ".join(rng.choice(_WORDS) for _ in range(rng.randint(3, 12))) + f" w{rng.randrange(100)}"
+             for _ in range(args.utterances)]
+    print(f"{'entries':>8}{'build ms':>10}{'old us/utt':>12}{'new us/utt':>12}{'speedup':>9}")
+    for n in args.entries:
+        lex = _lexicon(n, args.regex_share, rng)
+        t0 = time.perf_counter()
+        matcher = _Matcher(lex)
+        build = (time.perf_counter() - t0) * 1000
+
+        # the old loop overflows re's pattern cache past ~500 phrases; time it on fewer texts
+        few = texts[:max(5, min(len(texts), 20000 // n))]
+        t0 = time.perf_counter()
+        old = [_old_scores(lex, t) for t in few]
+        t_old = (time.perf_counter() - t0) / len(few) * 1e6
+        t0 = time.perf_counter()
+        for _ in range(10):
+            new = [matcher.scores(t) for t in texts]
+        t_new = (time.perf_counter() - t0) / (10 * len(texts)) * 1e6
+
+        for a, b in zip(old, new):
+            assert all(a[i] == b.get(i, 0) for i in _INTENTS), "compiled matcher disagrees with re.search"
+        print(f"{n:>8}{build:>10.1f}{t_old:>12.1f}{t_new:>12.1f}{t_old / t_new:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
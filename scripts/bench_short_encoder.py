@@ -0,0 +1,108 @@
+# scripts/bench_short_encoder.py
+"""
+Full 30 s padding vs the short-form encoder: encoder latency by clip length, and
+WER / end-to-end latency on recorded lesson targets.
+
+    python -m scripts.bench_short_encoder
+    python -m scripts.bench_short_encoder --audio-dir recordings/ --model openai/whisper-medium
+
+The latency table times the encoder pass alone on synthetic clips of each length,
+so the decoder (which doesn't care about the padding) stays out of it. With
+--audio-dir, every recording is also transcribed in both modes; "fallback" is
+how often the short-form quality guard re-ran a clip with full padding.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+import torch
+from transformers.utils import logging as hf_logging
+
+from asr import decoder
+from asr.backends import TransformersWhisper
+from asr.decoder import TARGET_SR, _encode, _features, _short_frames
+from scripts.bench_precision import _wer
+from scripts.lesson_clips import iter_lesson_clips
+
+hf_logging.set_verbosity_error()
+
+
+def _time_encoder(backend, audio, mode: str, repeats: int) -> float:
+    feats = _features(backend.processor, audio, backend.device, torch.float32)
+    n_frames = _short_frames(backend.processor, audio, mode)
+    runs = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        _encode(backend.model, feats, True, n_frames)
+        runs.append(time.perf_counter() - t0)
+    return statistics.median(runs) * 1000
+
+
+def _clips_run(backend, clips, mode: str, lang: str):
+    backend.encoder_mode = mode
+    fallbacks = 0
+    if mode == "short":
+        # count quality-guard re-runs without changing what the guard does
+        guard = decoder._suspicious
+
+        def _counting(text, seconds):
+            nonlocal fallbacks
+            hit = guard(text, seconds)
+            fallbacks += hit
+            return hit
+        decoder._suspicious = _counting
+    try:
+        lat, wers = [], []
+        for target, _, audio in clips:
+            t0 = time.perf_counter()
+            text = backend.transcribe(audio, lang)
+            lat.append((time.perf_counter() - t0) * 1000)
+            wers.append(_wer(text, target))
+    finally:
+        if mode == "short":
+            decoder._suspicious = guard
+    return statistics.mean(wers), statistics.mean(lat), fallbacks
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--model", default="openai/whisper-small")
+    ap.add_argument("--seconds", nargs="+", type=float, default=[1.0, 3.0, 8.0])
+    ap.add_argument("--repeats", type=int, default=3)
+    ap.add_argument("--audio-dir", help="recorded lesson targets (see scripts/lesson_clips.py)")
+    ap.add_argument("--lessons-dir", default="lessons")
+    ap.add_argument("--lang", default="ar")
+    ap.add_argument("--threads", type=int, default=0, help="torch CPU threads (0 = torch default)")
+    args = ap.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    backend = TransformersWhisper.load(args.model, "fp32")
+    rng = np.random.default_rng(0)
+    print(f"[bench_short_encoder] {args.model}, cpu threads={torch.get_num_threads()}")
+
+    _time_encoder(backend, np.zeros(TARGET_SR, dtype=np.float32), "short", 1)  # warm-up
+    print(f"{'clip s':>7}{'full ms':>10}{'short ms':>10}{'speedup':>10}")
+    for sec in args.seconds:
+        audio = (0.05 * rng.standard_normal(int(sec * TARGET_SR))).astype(np.float32)
+        full = _time_encoder(backend, audio, "full", args.repeats)
+        short = _time_encoder(backend, audio, "short", args.repeats)
+        print(f"{sec:>7.1f}{full:>10.0f}{short:>10.0f}{full / short:>9.1f}x")
+
+    if args.audio_dir:
+        clips = list(iter_lesson_clips(args.audio_dir, args.lessons_dir))
+        if not clips:
+            raise SystemExit(f"no recordings of lesson targets found in {args.audio_dir}")
+        print(f"\n{len(clips)} lesson clips")
+        print(f"{'mode':<7}{'WER':>7}{'mean ms':>9}{'fallback':>10}")
+        for mode in ("full", "short"):
+            wer, ms, fb = _clips_run(backend, clips, mode, args.lang)
+            print(f"{mode:<7}{wer:>7.2f}{ms:>9.0f}{fb:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# scripts/bench_speculative.py
+"""
+Speculative ("Advanced-fast") Whisper decoding: draft acceptance rate and latency vs plain decoding.
+
+    python -m scripts.bench_speculative --audio-dir recordings/
+    python -m scripts.bench_speculative --audio-dir recordings/ --model ychafiqui/whisper-medium-darija --draft ychafiqui/whisper-small-darija
+
+Each recorded lesson target is transcribed by the draft model alone, the main
+model alone, and the main model with the draft as its assistant. Acceptance is
+the share of drafted tokens the main model kept; tokens/pass is how many tokens
+each main-model forward pass produced on average (1.0 without a draft).
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+
+import torch
+from transformers.generation.candidate_generator import AssistedCandidateGenerator
+from transformers.utils import logging as hf_logging
+
+from asr.backends import TransformersWhisper
+from scripts.bench_precision import _wer
+from scripts.lesson_clips import iter_lesson_clips
+
+hf_logging.set_verbosity_error()
+
+
+class _Acceptance:
+    """Counts drafted / accepted tokens by wrapping AssistedCandidateGenerator."""
+
+    def __init__(self):
+        self.drafted = self.accepted = self.passes = 0
+
+    def __enter__(self):
+        self._get, self._update = AssistedCandidateGenerator.get_candidates, AssistedCandidateGenerator.update_candidate_strategy
+        stats = self
+
+        def get_candidates(gen, input_ids):
+            candidate_ids, logits = stats._get(gen, input_ids)
+            stats.drafted += candidate_ids.shape[-1] - input_ids.shape[-1]
+            return candidate_ids, logits
+
+        def update_candidate_strategy(gen, input_ids, scores, num_matches):
+            stats.accepted += int(num_matches)
+            stats.passes += 1
+            return stats._update(gen, input_ids, scores, num_matches)
+
+        AssistedCandidateGenerator.get_candidates = get_candidates
+        AssistedCandidateGenerator.update_candidate_strategy = update_candidate_strategy
+        return self
+
+    def __exit__(self, *exc):
+        AssistedCandidateGenerator.get_candidates = self._get
+        AssistedCandidateGenerator.update_candidate_strategy = self._update
+
+
+def _run(backend, clips, lang):
+    backend.transcribe(clips[0][2], lang)  # warm-up
+    lat, wers = [], []
+    for target, _, audio in clips:
+        t0 = time.perf_counter()
+        text = backend.transcribe(audio, lang)
+        lat.append((time.perf_counter() - t0) * 1000)
+        wers.append(_wer(text, target))
+    lat.sort()
+    return statistics.mean(wers), statistics.mean(lat), lat[min(len(lat) - 1, int(0.95 * len(lat)))]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--audio-dir", required=True)
+    ap.add_argument("--lessons-dir", default="lessons")
+    ap.add_argument("--model", default="openai/whisper-medium")
+    ap.add_argument("--draft", default="openai/whisper-small")
+    ap.add_argument("--precision", default="fp32")
+    ap.add_argument("--lang", default="ar")
+    ap.add_argument("--threads", type=int, default=0, help="torch CPU threads (0 = torch default)")
+    args = ap.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    clips = list(iter_lesson_clips(args.audio_dir, args.lessons_dir))
+    if not clips:
+        raise SystemExit(f"no recordings of lesson targets found in {args.audio_dir}")
+    print(f"[bench_speculative] {args.model} drafted by {args.draft} on {len(clips)} clips, "
+          f"cpu threads={torch.get_num_threads()}")
+
+    main_b = TransformersWhisper.load(args.model, args.precision)
+    draft_b = TransformersWhisper.load(args.draft, args.precision)
+    fast_b = TransformersWhisper(main_b.processor, main_b.model, assistant=draft_b.model)
+
+    print(f"{'mode':<16}{'WER':>7}{'mean ms':>9}{'p95 ms':>8}{'accept':>8}{'tok/pass':>10}")
+    for name, backend in (("draft only", draft_b), ("main only", main_b)):
+        wer, mean, p95 = _run(backend, clips, args.lang)
+        print(f"{name:<16}{wer:>7.2f}{mean:>9.0f}{p95:>8.0f}{'-':>8}{1.0:>10.2f}")
+
+    with _Acceptance() as acc:
+        wer, mean, p95 = _run(fast_b, clips, args.lang)
+    accept = acc.accepted / max(1, acc.drafted)
+    # every pass keeps the accepted drafts plus one token of the main model's own
+    per_pass = (acc.accepted + acc.passes) / max(1, acc.passes)
+    print(f"{'main + draft':<16}{wer:>7.2f}{mean:>9.0f}{p95:>8.0f}{accept:>8.0%}{per_pass:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
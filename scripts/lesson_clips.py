@@ -0,0 +1,47 @@
+# scripts/lesson_clips.py
+"""
+Recorded lesson targets for the ASR benchmarks.
+
+Recordings live in one directory, named after the target they say with spaces
+replaced by underscores, optionally followed by a take number:
+
+    salam_3likom.wav  salam_3likom.2.wav  labas.wav  سلام_عليكم.wav
+"""
+from __future__ import annotations
+
+import glob
+import json
+import os
+from typing import Iterator, List, Tuple
+
+import numpy as np
+
+from utils.wavfile import read_wav
+
+LESSONS_DIR = "lessons"
+
+
+def clip_slug(target: str) -> str:
+    return "_".join(target.strip().lower().split()).replace("/", "-")
+
+
+def lesson_targets(lessons_dir: str = LESSONS_DIR) -> List[str]:
+    seen, out = set(), []
+    for path in sorted(glob.glob(os.path.join(lessons_dir, "*.json"))):
+        with open(path, "r", encoding="utf-8") as f:
+            lesson = json.load(f)
+        for turn in lesson.get("turns", []):
+            for t in turn.get("targets", []):
+                if t not in seen:
+                    seen.add(t)
+                    out.append(t)
+    return out
+
+
+def iter_lesson_clips(audio_dir: str, lessons_dir: str = LESSONS_DIR) -> Iterator[Tuple[str, str, np.ndarray]]:
+    """Yield (target, wav path, 16 kHz audio) for every lesson target that has a recording."""
+    for target in lesson_targets(lessons_dir):
+        slug = clip_slug(target)
+        for path in sorted(glob.glob(os.path.join(audio_dir, slug + ".wav"))
+                           + glob.glob(os.path.join(audio_dir, slug + ".*.wav"))):
+            yield target, path, read_wav(path)
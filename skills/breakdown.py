@@ -1,17 +1,13 @@
-import json, os
+from skills.lexicon import get_lexicon
 
 def breakdown(text, script="arabizi"):
-    lexicon_path = os.path.join(os.path.dirname(__file__), "..", "data", "darija_lexicon.json")
     try:
-        with open(lexicon_path, "r", encoding="utf-8") as f:
-            lexicon = json.load(f)
+        lexicon = get_lexicon()
     except Exception:
         return "[lexicon unavailable]"
-    # very simple: just return glosses for each token
-    tokens = text.strip().split()
+    # very simple: just return glosses for each token (misspelled Arabizi resolves to the nearest entry)
     out = []
-    for token in tokens:
-        entry = next((e for e in lexicon if e.get(script) == token or e.get("arabic") == token or e.get("arabizi") == token), None)
+    for token, entry in zip(text.strip().split(), lexicon.lookup_many(text.strip().split(), script)):
         if entry:
             out.append(f"{token}: {entry.get('gloss','?')} ({entry.get('register','?')})")
         else:
@@ -1,18 +1,30 @@
-import json, os
+from skills.verbs import get_verb_store
 
 def conjugation_table(verb, script="arabizi"):
-    verbs_path = os.path.join(os.path.dirname(__file__), "..", "data", "verbs.json")
     try:
-        with open(verbs_path, "r", encoding="utf-8") as f:
-            verbs = json.load(f)
+        store = get_verb_store()
     except Exception:
         return "[verbs unavailable]"
-    v = verb.strip().split()[0].lower()
-    entry = verbs.get(v)
-    if not entry:
+    words = verb.strip().split()
+    v = words[0].lower() if words else ""
+    # the infinitive, its Arabic spelling, or any conjugated form of it
+    lemma = store.lemma(v) if v else None
+    if not lemma:
         return f"[no data for '{v}']"
+    entry = store.verbs[lemma]
     forms = entry.get("paradigm", {})
-    lines = [f"{v} ({entry.get('arabic','?')}):"]
+    lines = [f"{lemma} ({entry.get('arabic','?')}):"]
     for pron, form in forms.items():
         lines.append(f"  {pron}: {form}")
     return "\n".join(lines)
+
+def identify_form(word, script="arabizi"):
+    try:
+        store = get_verb_store()
+    except Exception:
+        return "[verbs unavailable]"
+    w = word.strip().split()[0] if word.strip() else ""
+    hits = store.identify_form(w) if w else []
+    if not hits:
+        return f"[no data for '{w}']"
+    return f"{w}: " + "; ".join(f"{lemma}, {pron}" for lemma, pron in hits)
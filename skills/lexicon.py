@@ -0,0 +1,147 @@
+# skills/lexicon.py
+from __future__ import annotations
+import json
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional
+
+from rapidfuzz.distance import Levenshtein
+
+LEXICON_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "darija_lexicon.json"))
+
+# Misspellings within this many edits of a lexicon word still resolve (SymSpell deletes)
+FUZZY_MAX_EDIT = 1
+# Shorter tokens are too ambiguous to guess at ("wa" is one edit from half the lexicon)
+FUZZY_MIN_LEN = 3
+
+_AR_MARKS = re.compile(r"[\u064B-\u065F\u0670\u0640]")
+_AR_FOLD = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ى": "ي", "ة": "ه"})
+_REPEATS = re.compile(r"(.)\1+")
+_EDGE_PUNCT = ".,!?;:\"'()[]«»،؛؟…"
+
+def normalize_token(token: str) -> str:
+    """
+    Spelling-insensitive key: lowercase, no edge punctuation, no Arabic diacritics or
+    alef/ta-marbuta variants, Arabizi sh/ch and ou/u unified, doubled letters collapsed
+    (so "Bzzaf!", "bzaf" and "bezzaf" differ only where the letters really do).
+    """
+    s = _AR_MARKS.sub("", token.strip().lower().strip(_EDGE_PUNCT)).translate(_AR_FOLD)
+    s = s.replace("sh", "ch").replace("ou", "u")
+    return _REPEATS.sub(r"\1", s)
+
+def _deletes(word: str, depth: int) -> set:
+    out, frontier = {word}, {word}
+    for _ in range(depth):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        out |= frontier
+    return out
+
+class Lexicon:
+    """
+    The Darija lexicon (a JSON list of {"arabic", "arabizi", "gloss", "register", ...}),
+    indexed by exact Arabic, exact Arabizi, normalize_token() of both, and a SymSpell
+    delete index over the normalized forms for misspellings. When several entries
+    share a key the earliest one wins, as with the old linear scan.
+    """
+
+    def __init__(self, entries: List[dict]):
+        self.entries = [e for e in entries if isinstance(e, dict)]
+        self._exact: Dict[str, Dict[str, int]] = {"arabic": {}, "arabizi": {}}
+        self._norm: Dict[str, int] = {}
+        for i, e in enumerate(self.entries):
+            for field, idx in self._exact.items():
+                word = e.get(field)
+                if isinstance(word, str) and word:
+                    idx.setdefault(word, i)
+                    self._norm.setdefault(normalize_token(word), i)
+        self._deletes: Optional[Dict[str, List[str]]] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, path: str = LEXICON_PATH) -> "Lexicon":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, list):
+            raise ValueError(f"{path}: expected a list of entries")
+        return cls(data)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _index(self, field: str) -> Dict[str, int]:
+        idx = self._exact.get(field)
+        if idx is None:
+            # other scripts (e.g. "latin") get indexed the first time someone asks for them
+            idx = {}
+            for i, e in enumerate(self.entries):
+                word = e.get(field)
+                if isinstance(word, str) and word:
+                    idx.setdefault(word, i)
+            self._exact[field] = idx
+        return idx
+
+    def _fuzzy_index(self) -> Dict[str, List[str]]:
+        with self._lock:
+            if self._deletes is None:
+                deletes: Dict[str, List[str]] = {}
+                for key in self._norm:
+                    if len(key) >= FUZZY_MIN_LEN:
+                        for d in _deletes(key, FUZZY_MAX_EDIT):
+                            deletes.setdefault(d, []).append(key)
+                self._deletes = deletes
+            return self._deletes
+
+    def exact(self, token: str, script: str = "arabizi") -> Optional[dict]:
+        """The first entry whose `script`, Arabic or Arabizi form is exactly token."""
+        hits = [idx[token] for idx in (self._index(script), self._index("arabic"), self._index("arabizi"))
+                if token in idx]
+        return self.entries[min(hits)] if hits else None
+
+    def fuzzy(self, token: str, max_edit: int = FUZZY_MAX_EDIT) -> Optional[dict]:
+        """The closest entry within max_edit edits of token's normalized form (ties: earliest)."""
+        key = normalize_token(token)
+        if key in self._norm:
+            return self.entries[self._norm[key]]
+        if len(key) < FUZZY_MIN_LEN:
+            return None
+        max_edit = min(max_edit, FUZZY_MAX_EDIT)
+        index = self._fuzzy_index()
+        best = None
+        for d in _deletes(key, max_edit):
+            for cand in index.get(d, ()):
+                dist = Levenshtein.distance(key, cand, score_cutoff=max_edit)
+                if dist <= max_edit:
+                    rank = (dist, self._norm[cand])
+                    if best is None or rank < best:
+                        best = rank
+        return self.entries[best[1]] if best else None
+
+    def lookup(self, token: str, script: str = "arabizi", fuzzy: bool = True) -> Optional[dict]:
+        """Exact match first, then normalized spelling, then (if fuzzy) a near miss."""
+        entry = self.exact(token, script)
+        if entry is None:
+            if fuzzy:
+                entry = self.fuzzy(token)
+            else:
+                i = self._norm.get(normalize_token(token))
+                entry = self.entries[i] if i is not None else None
+        return entry
+
+    def lookup_many(self, tokens: Iterable[str], script: str = "arabizi",
+                    fuzzy: bool = True) -> List[Optional[dict]]:
+        return [self.lookup(t, script, fuzzy) for t in tokens]
+
+_LEXICON: Optional[Lexicon] = None
+_LEXICON_MTIME: Optional[int] = None
+_LEXICON_LOCK = threading.Lock()
+
+def get_lexicon() -> Lexicon:
+    """The process-wide lexicon, loaded once and reloaded when the file changes on disk."""
+    global _LEXICON, _LEXICON_MTIME
+    mtime = os.stat(LEXICON_PATH).st_mtime_ns
+    if _LEXICON is None or mtime != _LEXICON_MTIME:
+        with _LEXICON_LOCK:
+            if _LEXICON is None or mtime != _LEXICON_MTIME:
+                _LEXICON, _LEXICON_MTIME = Lexicon.load(LEXICON_PATH), mtime
+    return _LEXICON
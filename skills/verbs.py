@@ -0,0 +1,124 @@
+# skills/verbs.py
+from __future__ import annotations
+import json
+import marshal
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from skills.lexicon import normalize_token
+
+VERBS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "verbs.json"))
+CACHE_PATH = os.path.expanduser(os.environ.get("VERBS_CACHE_PATH", "~/.cache/darija-tutor/verbs.marshal"))
+
+# bump when the compiled layout changes, so old cache files are rebuilt
+_FORMAT = 1
+
+def _forms(value) -> List[str]:
+    # a paradigm cell is one form or several ("kla / kal" or a list)
+    if isinstance(value, str):
+        return [f.strip() for f in value.split("/") if f.strip()]
+    if isinstance(value, (list, tuple)):
+        return [f.strip() for f in value if isinstance(f, str) and f.strip()]
+    return []
+
+def compile_verbs(verbs: dict) -> dict:
+    """verbs.json -> plain dicts/lists/tuples that marshal can store: the verbs plus reverse indexes."""
+    by_lemma: Dict[str, str] = {}
+    by_arabic: Dict[str, str] = {}
+    by_form: Dict[str, List[Tuple[str, str]]] = {}
+    by_norm: Dict[str, List[Tuple[str, str]]] = {}
+    for lemma, entry in verbs.items():
+        if not isinstance(entry, dict):
+            continue
+        by_lemma.setdefault(lemma.lower(), lemma)
+        arabic = entry.get("arabic")
+        if isinstance(arabic, str) and arabic:
+            by_arabic.setdefault(arabic, lemma)
+        cells = [("infinitive", lemma)] + list((entry.get("paradigm") or {}).items())
+        for pron, value in cells:
+            for form in _forms(value):
+                hit = (lemma, pron)
+                for index, key in ((by_form, form.lower()), (by_norm, normalize_token(form))):
+                    if hit not in index.setdefault(key, []):
+                        index[key].append(hit)
+    return {
+        "verbs": {k: v for k, v in verbs.items() if isinstance(v, dict)},
+        "by_lemma": by_lemma,
+        "by_arabic": by_arabic,
+        "by_form": by_form,
+        "by_norm": by_norm,
+    }
+
+class VerbStore:
+    """
+    data/verbs.json compiled for O(1) lookups: by infinitive (any case), by Arabic
+    script, and from every conjugated form back to (infinitive, person). The compiled
+    dicts are cached with marshal next to the reply cache, keyed by the source file's
+    mtime and size, so startup skips the JSON parse and index build.
+    """
+
+    def __init__(self, compiled: dict):
+        self.verbs: Dict[str, dict] = compiled["verbs"]
+        self._by_lemma: Dict[str, str] = compiled["by_lemma"]
+        self._by_arabic: Dict[str, str] = compiled["by_arabic"]
+        self._by_form: Dict[str, List[Tuple[str, str]]] = compiled["by_form"]
+        self._by_norm: Dict[str, List[Tuple[str, str]]] = compiled["by_norm"]
+
+    @classmethod
+    def load(cls, path: str = VERBS_PATH, cache_path: Optional[str] = CACHE_PATH) -> "VerbStore":
+        st = os.stat(path)
+        stamp = (_FORMAT, os.path.abspath(path), st.st_mtime_ns, st.st_size)
+        if cache_path:
+            try:
+                with open(cache_path, "rb") as f:
+                    cached = marshal.load(f)
+                if cached.get("stamp") == stamp:
+                    return cls(cached)
+            except (OSError, EOFError, ValueError, TypeError, AttributeError):
+                pass
+        with open(path, "r", encoding="utf-8") as f:
+            compiled = compile_verbs(json.load(f))
+        if cache_path:
+            compiled["stamp"] = stamp
+            try:
+                os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+                tmp = f"{cache_path}.{os.getpid()}.tmp"
+                with open(tmp, "wb") as f:
+                    marshal.dump(compiled, f)
+                os.replace(tmp, cache_path)
+            except OSError as e:
+                print(f"[verbs] could not write {cache_path}: {e}")
+        return cls(compiled)
+
+    def lemma(self, word: str) -> Optional[str]:
+        """The infinitive for an infinitive, its Arabic spelling, or any conjugated form of it."""
+        w = word.strip()
+        hit = self._by_lemma.get(w.lower()) or self._by_arabic.get(w)
+        if hit is None:
+            forms = self.identify_form(w)
+            hit = forms[0][0] if forms else None
+        return hit
+
+    def identify_form(self, word: str) -> List[Tuple[str, str]]:
+        """Every (infinitive, person) that `word` is a form of; spelling variants match too."""
+        w = word.strip()
+        return list(self._by_form.get(w.lower()) or self._by_norm.get(normalize_token(w)) or [])
+
+    def entry(self, word: str) -> Optional[dict]:
+        lemma = self.lemma(word)
+        return self.verbs.get(lemma) if lemma is not None else None
+
+_STORE: Optional[VerbStore] = None
+_STORE_MTIME: Optional[int] = None
+_STORE_LOCK = threading.Lock()
+
+def get_verb_store() -> VerbStore:
+    """The process-wide verb store, reloaded when data/verbs.json changes on disk."""
+    global _STORE, _STORE_MTIME
+    mtime = os.stat(VERBS_PATH).st_mtime_ns
+    if _STORE is None or mtime != _STORE_MTIME:
+        with _STORE_LOCK:
+            if _STORE is None or mtime != _STORE_MTIME:
+                _STORE, _STORE_MTIME = VerbStore.load(VERBS_PATH), mtime
+    return _STORE
@@ -0,0 +1,69 @@
+# tests/test_backends.py
+import threading
+import time
+
+from llm.backends import BackendPool, CircuitBreaker, LLMBackend
+
+
+def _open(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.failures):
+        breaker.failure()
+
+
+def test_breaker_half_open_lets_one_trial_through():
+    b = CircuitBreaker(failures=2, cooldown=0.05)
+    _open(b)
+    assert b.state == "open" and not b.allow()
+    time.sleep(0.06)
+    assert b.state == "half-open"
+    assert b.allow()
+    assert not b.allow()  # only one trial at a time
+    b.success()
+    assert b.state == "closed" and b.allow()
+
+
+def test_breaker_failed_trial_reopens():
+    b = CircuitBreaker(failures=2, cooldown=0.05)
+    _open(b)
+    time.sleep(0.06)
+    assert b.allow()
+    b.failure()
+    assert b.state == "open" and not b.allow()
+
+
+def test_unused_spare_does_not_take_the_half_open_trial():
+    fast = LLMBackend("fast", lambda on_token=None: "hi")
+    spare = LLMBackend("spare", lambda on_token=None: "unused")
+    spare.breaker = CircuitBreaker(failures=1, cooldown=0.01)
+    _open(spare.breaker)
+    time.sleep(0.02)
+    assert BackendPool([fast, spare]).call() == "hi"
+    assert spare.breaker.state == "half-open"
+    assert spare.breaker.allow()
+
+
+def test_lost_hedge_hands_back_the_half_open_trial():
+    release = threading.Event()
+
+    def slow(on_token=None):
+        release.wait(1)
+        on_token("late")
+        return "late"
+
+    def quick(on_token=None):
+        time.sleep(0.05)
+        on_token("hi")
+        release.set()
+        return "hi"
+
+    primary = LLMBackend("primary", quick)
+    primary.latency.p95 = lambda default=None: 0.0  # hedge straight away
+    hedge = LLMBackend("hedge", slow)
+    hedge.breaker = CircuitBreaker(failures=1, cooldown=0.01)
+    _open(hedge.breaker)
+    time.sleep(0.02)
+    assert BackendPool([primary, hedge]).call() == "hi"
+    deadline = time.monotonic() + 1
+    while hedge.breaker.state == "half-open" and not hedge.breaker.allow():
+        assert time.monotonic() < deadline, "lost hedge kept the half-open trial"
+        time.sleep(0.01)
@@ -0,0 +1,77 @@
+# tests/test_decoder.py
+import numpy as np
+
+from asr import decoder
+
+SR = decoder.TARGET_SR
+ONSET = 16000   # first voiced sample
+PRE = 3200      # 0.2 s pre-roll
+MIN_SPEECH = 2400
+
+
+class _StubGate:
+    """Voice from ONSET on; the phrase only counts once MIN_SPEECH of it has been heard."""
+
+    def __init__(self):
+        self.pre, self.n = PRE, 0
+
+    def push(self, y):
+        self.n += len(y)
+        return []
+
+    @property
+    def pending_start(self):
+        return ONSET if self.n > ONSET else None
+
+    @property
+    def voiced_any(self):
+        return self.n >= ONSET + MIN_SPEECH
+
+    def endpoint(self, tail_sec):
+        return False
+
+    def segments(self):
+        return [(ONSET - PRE, self.n)] if self.voiced_any else []
+
+
+class _Blocks:
+    """inbuf stand-in: hands out one block per read() and ends the hold after the last."""
+
+    def __init__(self, window, audio, block):
+        self.window, self.blocks = window, [audio[i:i + block] for i in range(0, len(audio), block)]
+
+    def read(self):
+        if not self.blocks:
+            self.window.recording = False
+            return np.zeros(0, dtype=np.float32)
+        return self.blocks.pop(0)
+
+
+class _Backend:
+    def __init__(self):
+        self.heard = []
+
+    def transcribe_words(self, audio16, lang="auto"):
+        self.heard.append(np.array(audio16))
+        return []
+
+
+class _Window:
+    recording = True
+    mic_sr = SR
+
+
+def test_streaming_keeps_the_pre_roll_before_a_soft_onset(monkeypatch):
+    monkeypatch.setattr(decoder, "VAD", True)
+    monkeypatch.setattr(decoder, "VoiceGate", _StubGate)
+    monkeypatch.setattr(decoder, "AUTO_RELEASE_SEC", 0.0)
+    # each sample holds its own position, so whatever reaches the model shows where it starts
+    audio = np.arange(3 * SR, dtype=np.float32) / (4 * SR)
+    window, backend = _Window(), _Backend()
+    decoder._run_streaming(window, SR, backend, _Blocks(window, audio, 480), lambda t: None, lambda t: None)
+
+    assert backend.heard
+    first = backend.heard[0]
+    start = int(round(first[0] * 4 * SR))
+    assert start <= ONSET - PRE
+    np.testing.assert_array_equal(first[ONSET - PRE - start:ONSET - start], audio[ONSET - PRE:ONSET])
@@ -0,0 +1,36 @@
+# tests/test_tutor_client.py
+from llm import tutor_client
+from llm.backends import BackendPool, LLMBackend
+from llm.cache import ResponseCache
+
+
+def _down(transcript, lang, messages, on_token=None):
+    raise ConnectionError("tutor API unreachable")
+
+
+def _openai(transcript, lang, messages, on_token=None):
+    if on_token is not None:
+        on_token("salam!")
+    return "salam!"
+
+
+def test_failover_reply_is_not_cached_as_the_tutor_api(monkeypatch):
+    cache = ResponseCache(path=None)
+    monkeypatch.setattr(tutor_client, "TUTOR_API_URL", "http://tutor.local")
+    monkeypatch.setattr(tutor_client, "get_cache", lambda: cache)
+    pool = BackendPool([LLMBackend("tutor-api", _down), LLMBackend("openai", _openai)])
+    monkeypatch.setattr(tutor_client, "_pool", lambda: pool)
+
+    assert tutor_client.ask_llm("hello", "en") == "salam!"
+
+    def key(backend: str) -> str:
+        return tutor_client.cache_key("hello", "en", "normal", None, [],
+                                      tutor_client._backend_id(backend))
+    assert cache.get(key("tutor-api")) is None
+    assert cache.get(key("openai")) == "salam!"
+
+    # the next ask goes to the tutor API again instead of replaying OpenAI's answer
+    calls = []
+    pool.backends[0] = LLMBackend("tutor-api", lambda *a, on_token=None: calls.append(a) or "labas")
+    assert tutor_client.ask_llm("hello", "en") == "labas"
+    assert calls
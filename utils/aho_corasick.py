@@ -0,0 +1,57 @@
+# utils/aho_corasick.py
+from collections import deque
+from typing import Dict, Hashable, Iterable, Iterator, List, Tuple
+
+class AhoCorasick:
+    """
+    Multi-pattern substring search: every occurrence of every pattern in one pass
+    over the text, however many patterns there are.
+
+    Build with (pattern, value) pairs; iter(text) yields (end, pattern, value) for
+    each occurrence, where text[end - len(pattern):end] == pattern. Patterns are
+    matched as-is (lowercase both sides yourself if you want case-insensitivity).
+    """
+
+    def __init__(self, items: Iterable[Tuple[str, Hashable]]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._out: List[List[Tuple[str, Hashable]]] = [[]]
+        for pattern, value in items:
+            if not pattern:
+                continue
+            node = 0
+            for ch in pattern:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[node][ch] = nxt
+                    self._goto.append({})
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((pattern, value))
+        self._build_fail()
+
+    def _build_fail(self) -> None:
+        # breadth-first, so a node's fail target is always finished before the node itself
+        fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = fail[node]
+                while f and ch not in self._goto[f]:
+                    f = fail[f]
+                fail[nxt] = self._goto[f].get(ch, 0)
+                # every pattern ending at the fail target also ends here
+                self._out[nxt] = self._out[nxt] + self._out[fail[nxt]]
+        self._fail = fail
+
+    def iter(self, text: str) -> Iterator[Tuple[int, str, Hashable]]:
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for pattern, value in out[node]:
+                yield i + 1, pattern, value
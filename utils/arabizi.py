@@ -1,5 +1,5 @@
 # utils/arabizi.py
-import os, json, re, functools
+import os, json, re, threading
 
 # --- transliteration (Arabic letters -> Arabizi) ---
 _DIAC = re.compile(r"[\u064B-\u065F\u0670\u06D6-\u06ED]")
@@ -17,20 +17,41 @@ _MAP = {
     "و": "u", "ي": "i",
 }
 
+# one str.translate table: diacritics and tatweel dropped, every letter mapped in the same pass
+_TABLE = str.maketrans({**{k: v for k, v in _MAP.items() if len(k) == 1},
+                        _TATWEEL: None,
+                        **{chr(c): None for r in ((0x064B, 0x065F), (0x0670, 0x0670), (0x06D6, 0x06ED))
+                           for c in range(r[0], r[1] + 1)}})
+# multi-letter sources whose reading differs from their letters one by one (none today: لا -> l+a)
+_DIGRAPHS = {k: v for k, v in _MAP.items() if len(k) > 1 and k.translate(_TABLE) != v}
+_DIGRAPH_RE = re.compile("|".join(map(re.escape, sorted(_DIGRAPHS, key=len, reverse=True)))) if _DIGRAPHS else None
+
 def arabic_to_arabizi(text: str) -> str:
     if not text: return ""
-    s = _DIAC.sub("", text.replace(_TATWEEL, ""))
-    # two-char first
-    s = s.replace("لا", "la")
-    out = []
-    i = 0
-    while i < len(s):
-        ch = s[i]
-        out.append(_MAP.get(ch, ch))
-        i += 1
-    res = "".join(out)
-    res = re.sub(r"\s+", " ", res).strip()
-    return res
+    s = text
+    if _DIGRAPH_RE is not None:
+        s = _DIGRAPH_RE.sub(lambda m: _DIGRAPHS[m.group(0)], _DIAC.sub("", s.replace(_TATWEEL, "")))
+    return " ".join(s.translate(_TABLE).split())
+
+def transliterate_piece(text: str) -> str:
+    """
+    arabic_to_arabizi for one streamed piece of a longer reply: letters only, spacing
+    left alone, so pieces still join up into words ("salam" + " 3likom").
+    """
+    return text.translate(_TABLE) if text else ""
+
+# below this many strings a pool costs more than it saves
+BATCH_MIN_PARALLEL = 5000
+
+def transliterate_batch(texts, processes=None, chunksize=2000):
+    """arabic_to_arabizi over many strings, in order; large batches go through a multiprocessing pool."""
+    texts = texts if isinstance(texts, list) else list(texts)
+    processes = processes or os.cpu_count() or 1
+    if processes == 1 or len(texts) < BATCH_MIN_PARALLEL:
+        return [arabic_to_arabizi(t) for t in texts]
+    import multiprocessing
+    with multiprocessing.Pool(processes) as pool:
+        return pool.map(arabic_to_arabizi, texts, chunksize=chunksize)
 
 def has_arabic_chars(s: str) -> bool:
     if not s: return False
@@ -59,23 +80,68 @@ def mentions_darija_word(text: str) -> bool:
     return bool(_DARIJA_WORD_RE.search(text))
 
 # --- mishear normalization (e.g., "cool feel the bass" -> "kulchi labas") ---
-@functools.lru_cache(maxsize=1)
+_MISHEARS_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "data", "mishears.json"))
+
 def _load_mishears():
-    here = os.path.dirname(__file__)
-    path = os.path.abspath(os.path.join(here, "..", "data", "mishears.json"))
     try:
-        with open(path, "r", encoding="utf-8") as f:
+        with open(_MISHEARS_PATH, "r", encoding="utf-8") as f:
             return json.load(f)
     except Exception:
         return {}
 
-def normalize_mishears(text: str) -> str:
-    table = _load_mishears()
-    if not text or not table: return text
-    s = text
+def _trie_pattern(words) -> str:
+    """
+    One regex for all `words`, nested by shared prefix, so matching walks the trie
+    instead of trying every alternative at every position. Children are tried before
+    ending a word, so the longest variant at a position wins.
+    """
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node):
+        alts = [re.escape(ch) + emit(child) for ch, child in sorted(node.items()) if ch]
+        if not alts:
+            return ""
+        end = "" in node
+        if len(alts) == 1 and not end:
+            return alts[0]
+        return "(?:" + "|".join(alts) + ")" + ("?" if end else "")
+    return emit(trie)
+
+def compile_mishears(table):
+    """(regex, variant.lower() -> canonical) for a {canonical: [variants]} table; first canonical wins."""
+    lookup = {}
     for canonical, variants in table.items():
         for v in variants:
-            # case-insensitive whole/partial phrase replace
-            pattern = re.compile(re.escape(v), re.IGNORECASE)
-            s = pattern.sub(canonical, s)
-    return s
+            if v:
+                lookup.setdefault(v.lower(), canonical)
+    if not lookup:
+        return None, lookup
+    return re.compile(_trie_pattern(lookup), re.IGNORECASE), lookup
+
+_mishears_state = (object(), None, {})  # (file mtime, regex, lookup)
+_mishears_lock = threading.Lock()
+
+def _compiled_mishears():
+    global _mishears_state
+    try:
+        mtime = os.stat(_MISHEARS_PATH).st_mtime_ns
+    except OSError:
+        mtime = None
+    state = _mishears_state
+    if state[0] != mtime:
+        with _mishears_lock:
+            if _mishears_state[0] != mtime:
+                _mishears_state = (mtime,) + compile_mishears(_load_mishears())
+            state = _mishears_state
+    return state[1], state[2]
+
+def normalize_mishears(text: str) -> str:
+    # case-insensitive whole/partial phrase replace, all variants in one left-to-right pass
+    rx, lookup = _compiled_mishears()
+    if not text or rx is None: return text
+    return rx.sub(lambda m: lookup.get(m.group(0).lower(), m.group(0)), text)
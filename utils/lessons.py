@@ -0,0 +1,271 @@
+# utils/lessons.py
+"""
+Lesson compiler and bundle loader.
+
+    python -m utils.lessons            # validate lessons/*.json and write the bundle
+    python -m utils.lessons --check    # validate only
+
+Every lesson is validated and compiled into frozen dataclasses with its targets
+already indexed for scoring (utils.score.TargetIndex). The bundle is one file:
+a small header mapping unit -> byte range, then one pickle per lesson, so
+opening it reads only the header and a unit is unpickled the first time it is
+asked for.
+"""
+from __future__ import annotations
+import argparse
+import glob
+import json
+import os
+import pickle
+import struct
+import threading
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from utils.score import TargetIndex, target_index
+
+LESSONS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "lessons"))
+BUNDLE_PATH = os.path.expanduser(os.environ.get("LESSON_BUNDLE", "~/.cache/darija-tutor/lessons.bundle"))
+
+_MAGIC = b"DTLESSONS1\n"
+_HEADER_LEN = struct.Struct("<Q")
+# bump when Turn/Lesson change shape, so old bundles are rebuilt; edits to the scoring
+# code the pickled TargetIndex keys come from are caught by _code_version()
+_FORMAT = 2
+_CODE = [os.path.join(os.path.dirname(__file__), name) for name in ("lessons.py", "score.py", "arabizi.py")]
+
+def _code_version() -> Tuple[int, ...]:
+    return (_FORMAT,) + tuple(zlib.crc32(open(path, "rb").read()) for path in _CODE)
+
+class LessonError(ValueError):
+    """A lesson file that doesn't match the expected schema."""
+
+@dataclass(frozen=True)
+class Turn:
+    prompt_text: str
+    prompt_darija: str
+    hint_darija: str
+    intents: Tuple[str, ...]
+    targets: Tuple[str, ...]
+    tips: Tuple[str, ...]
+    target_index: TargetIndex
+
+    # dict-style access, so code written for the raw JSON turns keeps working
+    # (empty optional fields read as missing, as when the key was absent from the JSON)
+    def get(self, key: str, default: Any = None) -> Any:
+        value = getattr(self, key, default)
+        return default if default is not None and value in ((), "") else value
+
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+@dataclass(frozen=True)
+class Lesson:
+    unit: str
+    turns: Tuple[Turn, ...]
+    source: str
+
+def _strings(value: Any, where: str, required: bool = False) -> Tuple[str, ...]:
+    if value is None and not required:
+        return ()
+    if not isinstance(value, list) or not all(isinstance(v, str) for v in value):
+        raise LessonError(f"{where}: expected a list of strings")
+    if required and not value:
+        raise LessonError(f"{where}: must not be empty")
+    return tuple(value)
+
+def _text(value: Any, where: str, required: bool = False) -> str:
+    if value is None and not required:
+        return ""
+    if not isinstance(value, str) or (required and not value.strip()):
+        raise LessonError(f"{where}: expected a non-empty string")
+    return value
+
+def compile_lesson(data: Any, source: str) -> Lesson:
+    """Validate one parsed lesson JSON and compile it; LessonError names the offending field."""
+    if not isinstance(data, dict):
+        raise LessonError(f"{source}: expected an object")
+    unit = _text(data.get("unit"), f"{source}: unit", required=True)
+    raw_turns = data.get("turns")
+    if not isinstance(raw_turns, list) or not raw_turns:
+        raise LessonError(f"{source}: turns must be a non-empty list")
+    turns = []
+    for i, t in enumerate(raw_turns):
+        where = f"{source}: turns[{i}]"
+        if not isinstance(t, dict):
+            raise LessonError(f"{where}: expected an object")
+        targets = _strings(t.get("targets"), f"{where}.targets", required=True)
+        intents = _strings(t.get("intents"), f"{where}.intents")
+        turns.append(Turn(
+            prompt_text=_text(t.get("prompt_text"), f"{where}.prompt_text", required=True),
+            prompt_darija=_text(t.get("prompt_darija"), f"{where}.prompt_darija"),
+            hint_darija=_text(t.get("hint_darija"), f"{where}.hint_darija"),
+            intents=intents,
+            targets=targets,
+            tips=_strings(t.get("tips"), f"{where}.tips"),
+            target_index=target_index(targets),
+        ))
+    return Lesson(unit=unit, turns=tuple(turns), source=os.path.basename(source))
+
+def _load_file(path: str) -> Lesson:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except ValueError as e:
+        raise LessonError(f"{path}: {e}") from None
+    return compile_lesson(data, path)
+
+def _stamp(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+def compile_lessons(lessons_dir: str = LESSONS_DIR, out: Optional[str] = BUNDLE_PATH) -> Dict[str, Lesson]:
+    """Compile every lessons_dir/*.json (all files are validated before anything is written)."""
+    lessons: Dict[str, Lesson] = {}
+    for path in sorted(glob.glob(os.path.join(lessons_dir, "*.json"))):
+        lesson = _load_file(path)
+        if lesson.unit in lessons:
+            raise LessonError(f"{path}: unit {lesson.unit!r} already defined in {lessons[lesson.unit].source}")
+        lessons[lesson.unit] = lesson
+    if out:
+        _write_bundle(lessons, lessons_dir, out)
+    return lessons
+
+def _write_bundle(lessons: Dict[str, Lesson], lessons_dir: str, out: str) -> None:
+    blobs, units, offset = [], {}, 0
+    for unit, lesson in lessons.items():
+        blob = pickle.dumps(lesson, protocol=pickle.HIGHEST_PROTOCOL)
+        path = os.path.join(lessons_dir, lesson.source)
+        units[unit] = (offset, len(blob), lesson.source) + _stamp(path)
+        blobs.append(blob)
+        offset += len(blob)
+    header = pickle.dumps({"version": _code_version(), "dir": os.path.abspath(lessons_dir),
+                           "dir_mtime": os.stat(lessons_dir).st_mtime_ns, "units": units},
+                          protocol=pickle.HIGHEST_PROTOCOL)
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    tmp = f"{out}.{os.getpid()}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(_MAGIC)
+        f.write(_HEADER_LEN.pack(len(header)))
+        f.write(header)
+        for blob in blobs:
+            f.write(blob)
+    os.replace(tmp, out)
+
+class LessonBundle:
+    """
+    Read side of a compiled bundle. Opening reads just the header; lesson(unit)
+    unpickles that unit on first use and keeps it. A unit whose JSON changed since
+    the bundle was written is recompiled from the JSON on access.
+    """
+
+    def __init__(self, path: Optional[str], header: dict, data_offset: int):
+        self.path = path
+        self.version = header.get("version")
+        self.lessons_dir = header["dir"]
+        self._units: Dict[str, tuple] = header["units"]
+        self._data_offset = data_offset
+        self._dir_mtime = header["dir_mtime"]
+        self._cache: Dict[str, Lesson] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, path: str = BUNDLE_PATH, lessons_dir: str = LESSONS_DIR) -> "LessonBundle":
+        """
+        The bundle at path, rebuilt first if it is missing, lessons were added/removed,
+        or it was written by a different version of the lesson/scoring code.
+        """
+        lessons_dir = os.path.abspath(lessons_dir)
+        try:
+            bundle = cls._read(path)
+            if ((bundle.version, bundle.lessons_dir, bundle._dir_mtime)
+                    == (_code_version(), lessons_dir, os.stat(lessons_dir).st_mtime_ns)):
+                return bundle
+        except (OSError, ValueError, EOFError, pickle.UnpicklingError, KeyError):
+            pass
+        try:
+            compile_lessons(lessons_dir, path)
+            return cls._read(path)
+        except OSError as e:
+            # unwritable cache dir: run from an in-memory compile this time
+            print(f"[lessons] could not write {path}: {e}")
+            return cls.from_lessons(compile_lessons(lessons_dir, None), lessons_dir)
+
+    @classmethod
+    def from_lessons(cls, lessons: Dict[str, Lesson], lessons_dir: str = LESSONS_DIR) -> "LessonBundle":
+        units = {unit: (0, 0, l.source) + _stamp(os.path.join(lessons_dir, l.source)) for unit, l in lessons.items()}
+        header = {"version": _code_version(), "dir": os.path.abspath(lessons_dir), "dir_mtime": None, "units": units}
+        bundle = cls(None, header, 0)
+        bundle._cache.update(lessons)
+        return bundle
+
+    @classmethod
+    def _read(cls, path: str) -> "LessonBundle":
+        with open(path, "rb") as f:
+            if f.read(len(_MAGIC)) != _MAGIC:
+                raise ValueError(f"{path}: not a lesson bundle")
+            (n,) = _HEADER_LEN.unpack(f.read(_HEADER_LEN.size))
+            header = pickle.loads(f.read(n))
+        return cls(path, header, len(_MAGIC) + _HEADER_LEN.size + n)
+
+    @property
+    def units(self) -> List[str]:
+        return list(self._units)
+
+    def __contains__(self, unit: str) -> bool:
+        return unit in self._units
+
+    def __len__(self) -> int:
+        return len(self._units)
+
+    def lesson(self, unit: str) -> Lesson:
+        with self._lock:
+            offset, length, source, mtime, size = self._units[unit]
+            src = os.path.join(self.lessons_dir, source)
+            cached = self._cache.get(unit)
+            try:
+                fresh = _stamp(src) == (mtime, size)
+            except OSError:
+                fresh = True  # JSON gone: the compiled copy is all there is
+            if cached is not None and fresh:
+                return cached
+            if fresh:
+                with open(self.path, "rb") as f:
+                    f.seek(self._data_offset + offset)
+                    cached = pickle.loads(f.read(length))
+            else:
+                cached = _load_file(src)
+                self._units[unit] = (offset, length, source) + _stamp(src)
+            self._cache[unit] = cached
+            return cached
+
+_BUNDLE: Optional[LessonBundle] = None
+_BUNDLE_LOCK = threading.Lock()
+
+def load_lessons() -> LessonBundle:
+    """The process-wide lesson bundle (compiled on first run or when lessons/ changes)."""
+    global _BUNDLE
+    with _BUNDLE_LOCK:
+        if _BUNDLE is None:
+            _BUNDLE = LessonBundle.open()
+        return _BUNDLE
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__.strip().split("\n\n")[0])
+    ap.add_argument("--lessons-dir", default=LESSONS_DIR)
+    ap.add_argument("-o", "--out", default=BUNDLE_PATH)
+    ap.add_argument("--check", action="store_true", help="validate only, don't write the bundle")
+    args = ap.parse_args(argv)
+    try:
+        lessons = compile_lessons(args.lessons_dir, None if args.check else args.out)
+    except LessonError as e:
+        raise SystemExit(f"[lessons] {e}")
+    turns = sum(len(l.turns) for l in lessons.values())
+    print(f"[lessons] {len(lessons)} units, {turns} turns ok" + ("" if args.check else f" -> {args.out}"))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# utils/ring_buffer.py
+import numpy as np
+
+class AudioRing:
+    """
+    Fixed-size float32 ring for one producer (the audio callback) and one consumer
+    (the decoder thread).
+
+    Storage is twice the capacity and every write lands in both halves, so any
+    span of up to `capacity` samples is one contiguous slice and peek() can
+    return it as a view without copying. Positions only ever grow; the producer
+    fills samples before publishing the new write position, and the consumer is
+    the only one that moves the read position, so no lock is needed (Python int
+    assignment is atomic under the GIL).
+
+    When the consumer falls more than `capacity` samples behind, the oldest
+    unread audio is overwritten and counted in `dropped`. A view stays valid
+    until that much new audio has been written after it, so consume promptly.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError(f"capacity must be positive, got {capacity}")
+        self.capacity = int(capacity)
+        self._buf = np.zeros(2 * self.capacity, dtype=np.float32)
+        self._write = 0  # total samples ever written (producer-owned)
+        self._read = 0   # total samples ever consumed (consumer-owned)
+        self.dropped = 0
+
+    @classmethod
+    def for_duration(cls, seconds: float, sr: int) -> "AudioRing":
+        return cls(max(1, int(round(seconds * sr))))
+
+    # ---- producer ----
+    def write(self, x) -> None:
+        x = np.asarray(x, dtype=np.float32).reshape(-1)
+        w, cap = self._write, self.capacity
+        if len(x) > cap:
+            w += len(x) - cap  # only the newest `capacity` samples can survive anyway
+            x = x[-cap:]
+        n = len(x)
+        if n:
+            pos = w % cap
+            first = min(n, cap - pos)
+            self._buf[pos:pos + n] = x                      # crosses into the mirror half if it wraps
+            self._buf[pos + cap:pos + cap + first] = x[:first]
+            self._buf[:n - first] = x[first:]
+        self._write = w + n
+
+    # ---- consumer ----
+    def _start(self, w: int) -> int:
+        start = max(self._read, w - self.capacity)
+        if start > self._read:
+            self.dropped += start - self._read
+            self._read = start
+        return start
+
+    def __len__(self) -> int:
+        w = self._write
+        return w - self._start(w)
+
+    def peek(self, n: int | None = None) -> np.ndarray:
+        """Zero-copy view of the oldest unread samples (all of them, or at most n)."""
+        w = self._write
+        start = self._start(w)
+        size = w - start if n is None else max(0, min(n, w - start))
+        pos = start % self.capacity
+        return self._buf[pos:pos + size]
+
+    def consume(self, n: int) -> None:
+        self._read = min(self._write, self._read + max(0, int(n)))
+
+    def read(self, n: int | None = None) -> np.ndarray:
+        """peek() and consume() in one step."""
+        view = self.peek(n)
+        self._read += len(view)
+        return view
+
+    def clear(self) -> None:
+        self._read = self._write
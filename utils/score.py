@@ -1,46 +1,234 @@
+import re
+from functools import lru_cache
+from typing import Optional
+
+import numpy as np
+from rapidfuzz import process
 from rapidfuzz.distance import Levenshtein
 
+from utils.arabizi import arabic_to_arabizi, has_arabic_chars
+
+
+# basic cleanup, one translate pass
+_REPL = str.maketrans({
+	"’": "'",
+	"،": ",",
+	"؛": ";",
+	"؟": "?",
+})
+
 
 def normalize(txt: str) -> str:
 	if not txt:
 		return ""
-	t = txt.strip().lower()
-	# basic cleanup
-	repl = {
-		"’": "'",
-		"،": ",",
-		"؛": ";",
-		"؟": "?",
-	}
-	for k, v in repl.items():
-		t = t.replace(k, v)
-	return t
-
-
-def best_edit_distance(cand: str, targets: list[str]) -> tuple[int, str]:
+	return txt.strip().lower().translate(_REPL)
+
+
+@lru_cache(maxsize=1024)
+def normalized_targets(targets: tuple) -> tuple:
+	"""normalize() of each target, computed once per lesson turn's target list."""
+	return tuple(normalize(t) for t in targets)
+
+
+def best_edit_distance(cand: str, targets: list[str], max_distance: Optional[int] = None) -> tuple[int, str]:
+	"""
+	(distance, target) for the closest target, first one on ties; (999, "") if there
+	are none, or none within max_distance (which lets rapidfuzz stop early).
+	"""
 	if not targets:
 		return (999, "")
-	cand_n = normalize(cand)
-	best = (999, "")
-	for tgt in targets:
-		d = Levenshtein.distance(cand_n, normalize(tgt))
-		if d < best[0]:
-			best = (d, tgt)
-	return best
+	targets = tuple(targets)
+	hit = process.extractOne(normalize(cand), normalized_targets(targets), scorer=Levenshtein.distance,
+							 processor=None, score_cutoff=max_distance)
+	if hit is None:
+		return (999, "")
+	return (int(hit[1]), targets[hit[2]])
+
+
+def score_batch(transcripts: list[str], targets: list[str], max_distance: Optional[int] = None,
+				workers: int = -1) -> list[tuple[int, str]]:
+	"""
+	best_edit_distance() for many transcripts against one target list, as a single
+	rapidfuzz cdist matrix computed on `workers` threads (-1 = all cores).
+	"""
+	if not targets:
+		return [(999, "")] * len(transcripts)
+	targets = tuple(targets)
+	dist = process.cdist([normalize(t) for t in transcripts], normalized_targets(targets),
+						 scorer=Levenshtein.distance, processor=None, score_cutoff=max_distance,
+						 workers=workers)
+	out = []
+	for row in dist:
+		j = int(row.argmin())
+		d = int(row[j])
+		out.append((d, targets[j]) if max_distance is None or d <= max_distance else (999, ""))
+	return out
+
+
+# Arabizi spellings that sound the same: digraphs first, then single letters
+_PHON_DIGRAPHS = (("sh", "c"), ("ch", "c"), ("kh", "x"), ("gh", "g"), ("ou", "u"))
+# 3/a merge too: learners often leave the ain out ("salam alikom")
+_PHON_LETTERS = str.maketrans({"3": "a", "2": None, "7": "h", "9": "q", "5": "x", "e": "i", "o": "u"})
+_VOWELS = "aiu"
+_REPEATS = re.compile(r"(.)\1+")
+_PHON_WORD = re.compile(r"[a-z0-9]+")
+
+
+def to_arabizi(txt: str) -> str:
+	"""normalize(), then Arabic letters transliterated, so every target can be compared in Arabizi."""
+	t = normalize(txt)
+	return arabic_to_arabizi(t) if has_arabic_chars(t) else t
+
+
+def phonetic_key(txt: str) -> str:
+	"""
+	Arabizi form with spellings of the same sound merged: sh/ch, kh/x and 3/a collapse,
+	e/i and o/u fall into one vowel class each, doubled letters merge. Every vowel is
+	kept, so "bikher" and "bikhir" both give "bixir" while "slim" is still two edits
+	from "salam".
+	"""
+	s = to_arabizi(txt)
+	for a, b in _PHON_DIGRAPHS:
+		s = s.replace(a, b)
+	return " ".join(_REPEATS.sub(r"\1", w) for w in _PHON_WORD.findall(s.translate(_PHON_LETTERS)))
+
+
+def _cross_script_distance(latin: str, arabic: str, cutoff: Optional[int] = None) -> int:
+	"""
+	Levenshtein distance between the phonetic_key() of an Arabizi spelling and of an
+	Arabic-script one, where vowels inside an Arabizi word may be added or dropped for
+	free: Arabic script leaves short vowels out, so "bikhir" matches "بخير" but
+	"bukhara" is still two edits away (a wrong long vowel, an extra final one).
+	Returns cutoff + 1 once the distance is known to exceed cutoff.
+	"""
+	prev = list(range(len(arabic) + 1))
+	for i, ch in enumerate(latin):
+		free = ch in _VOWELS and 0 < i < len(latin) - 1 and latin[i - 1] != " " and latin[i + 1] != " "
+		cur = [prev[0] + (0 if free else 1)]
+		for j, a in enumerate(arabic, 1):
+			cur.append(min(prev[j] + (0 if free else 1), cur[j - 1] + 1, prev[j - 1] + (ch != a)))
+		if cutoff is not None and min(cur) > cutoff:
+			return cutoff + 1
+		prev = cur
+	return prev[-1]
+
+
+class TargetIndex:
+	"""
+	A turn's targets with every comparison key computed up front: the normalized
+	target, its Arabizi form (transliterated if it was Arabic) and its phonetic_key().
+	best() takes an exact hit on either spelling when there is one, otherwise the
+	smallest of the Arabizi and phonetic Levenshtein distances; an attempt in the
+	other script than the target is compared with _cross_script_distance(). Spelling
+	and script don't count as mistakes, wrong vowels and consonants do.
+	"""
+
+	def __init__(self, targets: list[str]):
+		self.targets = tuple(targets)
+		self.normalized = normalized_targets(self.targets)
+		self.arabizi = tuple(to_arabizi(t) for t in self.targets)
+		self.arabic = tuple(has_arabic_chars(t) for t in self.normalized)
+		self.phonetic = tuple(phonetic_key(t) for t in self.arabizi)
+		self._exact: dict[str, int] = {}
+		for i, keys in enumerate(zip(self.normalized, self.arabizi)):
+			for k in keys:
+				self._exact.setdefault(k, i)
+
+	def __len__(self) -> int:
+		return len(self.targets)
+
+	def _phonetic_distance(self, key: str, arabic: bool, j: int, cutoff: Optional[int]) -> int:
+		if self.arabic[j] == arabic:
+			return Levenshtein.distance(key, self.phonetic[j], score_cutoff=cutoff)
+		if arabic:
+			return _cross_script_distance(self.phonetic[j], key, cutoff)
+		return _cross_script_distance(key, self.phonetic[j], cutoff)
+
+	def best(self, cand: str, max_distance: Optional[int] = None) -> tuple[int, str]:
+		"""(distance, target) like best_edit_distance(), on the script/phonetics-aware keys."""
+		if not self.targets:
+			return (999, "")
+		c = normalize(cand)
+		arabic = has_arabic_chars(c)
+		i = self._exact.get(c)
+		if i is None:
+			c = to_arabizi(c)
+			i = self._exact.get(c)
+		if i is not None:
+			return (0, self.targets[i])
+		best = None
+		hit = process.extractOne(c, self.arabizi, scorer=Levenshtein.distance, processor=None,
+								 score_cutoff=max_distance)
+		if hit is not None:
+			best = (int(hit[1]), hit[2])
+		key = phonetic_key(c)
+		for j in range(len(self.targets)):
+			cutoff = max_distance if best is None else (best[0] - 1 if max_distance is None else min(max_distance, best[0] - 1))
+			if cutoff is not None and cutoff < 0:
+				break
+			d = self._phonetic_distance(key, arabic, j, cutoff)
+			if cutoff is None or d <= cutoff:
+				best = (d, j)
+		return (best[0], self.targets[best[1]]) if best is not None else (999, "")
+
+	def best_batch(self, transcripts: list[str], max_distance: Optional[int] = None,
+				   workers: int = -1) -> list[tuple[int, str]]:
+		"""
+		best() for many transcripts: Arabizi and same-script phonetic distances as cdist
+		matrices on `workers` threads, cross-script pairs filled in one by one.
+		"""
+		if not self.targets:
+			return [(999, "")] * len(transcripts)
+		norm = [normalize(t) for t in transcripts]
+		arabic = np.array([has_arabic_chars(t) for t in norm])
+		cands = [to_arabizi(t) for t in norm]
+		keys = [phonetic_key(c) for c in cands]
+		kw = dict(scorer=Levenshtein.distance, processor=None, score_cutoff=max_distance, workers=workers)
+		dist = np.minimum(process.cdist(cands, self.arabizi, **kw), process.cdist(keys, self.phonetic, **kw))
+		for i, j in zip(*np.nonzero(arabic[:, None] != np.array(self.arabic)[None, :])):
+			raw = min(int(dist[i, j]), Levenshtein.distance(cands[i], self.arabizi[j], score_cutoff=max_distance))
+			dist[i, j] = min(raw, self._phonetic_distance(keys[i], bool(arabic[i]), int(j), max_distance))
+		out = []
+		for row in dist:
+			j = int(row.argmin())
+			d = int(row[j])
+			out.append((d, self.targets[j]) if max_distance is None or d <= max_distance else (999, ""))
+		return out
+
+
+@lru_cache(maxsize=1024)
+def target_index(targets: tuple) -> TargetIndex:
+	return TargetIndex(list(targets))
+
+
+def word_error_rate(hyp: str, ref: str) -> float:
+	"""Word-level edit distance over the reference length, ignoring case and punctuation."""
+	ref_w = re.findall(r"[\w']+", normalize(ref))
+	hyp_w = re.findall(r"[\w']+", normalize(hyp))
+	if not ref_w:
+		return float(bool(hyp_w))
+	return Levenshtein.distance(hyp_w, ref_w) / len(ref_w)
+
+
+# checked in order; the first intent with a keyword in the transcript wins
+INTENT_KEYWORDS = {
+	"greet": ("salam", "slm", "salam 3lik", "as-salam"),
+	"how_are_you": ("labas", "bikher", "bikhir", "hamdullah"),
+}
 
 
 def guess_intent(cand: str) -> str:
 	c = normalize(cand)
-	if any(k in c for k in ["salam", "slm", "salam 3lik", "as-salam"]):
-		return "greet"
-	if any(k in c for k in ["labas", "bikher", "bikhir", "hamdullah"]):
-		return "how_are_you"
+	for intent, keywords in INTENT_KEYWORDS.items():
+		if any(k in c for k in keywords):
+			return intent
 	return "other"
 
 
 def score_turn(transcript: str, turn: dict) -> dict:
-	# distance to any allowed variant
-	dist, match = best_edit_distance(transcript, turn.get("targets", []))
+	# distance to any allowed variant, in whichever script/spelling is closest
+	index = turn.get("target_index") or target_index(tuple(turn.get("targets", [])))
+	dist, match = index.best(transcript)
 	# simple intent
 	intent = guess_intent(transcript)
 	intent_ok = intent in turn.get("intents", [])
@@ -2,13 +2,42 @@
 from __future__ import annotations
 
 class TurnManager:
-    def __init__(self, turns: list[dict]):
+    def __init__(self, turns, bundle=None, unit: str | None = None):
+        """`turns` of one lesson; with a compiled LessonBundle, jump() can switch units."""
         if not turns:
             raise ValueError("Empty lesson turns")
         self.turns = turns
+        self.bundle = bundle
+        self.unit = unit
         self.idx = 0
         self.fails = 0
 
+    @classmethod
+    def for_unit(cls, bundle, unit: str) -> "TurnManager":
+        return cls(bundle.lesson(unit).turns, bundle, unit)
+
+    def jump(self, unit: str) -> None:
+        """Start `unit` from its first turn (already compiled in the bundle, nothing is re-parsed)."""
+        if self.bundle is None:
+            raise ValueError("TurnManager has no lesson bundle to jump in")
+        turns = self.bundle.lesson(unit).turns
+        if not turns:
+            raise ValueError(f"Empty lesson turns in {unit!r}")
+        self.turns, self.unit = turns, unit
+        self.idx = 0
+        self.fails = 0
+
+    def next_unit(self) -> str | None:
+        """Jump to the unit after this one in the bundle; None (and no jump) at the last."""
+        if self.bundle is None:
+            return None
+        units = self.bundle.units
+        i = units.index(self.unit) + 1 if self.unit in units else 0
+        if i >= len(units):
+            return None
+        self.jump(units[i])
+        return self.unit
+
     @property
     def current(self) -> dict:
         return self.turns[self.idx]
@@ -0,0 +1,100 @@
+# utils/vad.py
+import numpy as np
+import webrtcvad
+
+SAMPLE_RATE = 16000
+FRAME_MS = 30            # 10, 20, or 30 for webrtcvad
+AGGRESSIVENESS = 2       # 0-3, 2 is medium-aggressive
+PRE_ROLL_SEC = 0.2       # audio kept before the first voiced frame of a phrase
+POST_ROLL_SEC = 0.3      # and after its last one
+SPLIT_GAP_SEC = 0.8      # silence this long ends a phrase
+MIN_SPEECH_SEC = 0.15    # shorter voiced bursts (clicks, bumps) are not phrases
+
+class VoiceGate:
+    """
+    Streaming webrtcvad over 16 kHz float32 audio.
+
+    push() classifies every complete 30 ms frame and groups voiced frames into
+    phrases (split on SPLIT_GAP_SEC of silence). Positions are absolute sample
+    counts since the gate was created, so callers can slice their own buffers.
+    """
+
+    def __init__(self, aggressiveness: int = AGGRESSIVENESS, sr: int = SAMPLE_RATE,
+                 frame_ms: int = FRAME_MS, pre_roll: float = PRE_ROLL_SEC,
+                 post_roll: float = POST_ROLL_SEC, split_gap: float = SPLIT_GAP_SEC,
+                 min_speech: float = MIN_SPEECH_SEC):
+        self.vad = webrtcvad.Vad(aggressiveness)
+        self.sr = sr
+        self.frame = sr * frame_ms // 1000
+        self.pre, self.post = int(pre_roll * sr), int(post_roll * sr)
+        self.gap, self.min_speech = int(split_gap * sr), int(min_speech * sr)
+        self._pcm = np.empty(self.frame, dtype=np.int16)
+        self._fill = 0
+        self.n = 0         # samples pushed
+        self._raw = []     # [first voiced sample, end of last voiced frame] per phrase
+
+    def push(self, x) -> list:
+        """Feed samples; returns the (pre-rolled) start of every phrase that opened."""
+        x = np.asarray(x, dtype=np.float32).reshape(-1)
+        opened = []
+        i = 0
+        while i < len(x):
+            k = min(len(x) - i, self.frame - self._fill)
+            np.clip(x[i:i + k] * 32768.0, -32768, 32767, out=self._pcm[self._fill:self._fill + k], casting="unsafe")
+            self._fill += k
+            i += k
+            if self._fill < self.frame:
+                break
+            self._fill = 0
+            end = self.n + i
+            if self.vad.is_speech(self._pcm.tobytes(), self.sr):
+                if self._raw and end - self.frame - self._raw[-1][1] < self.gap:
+                    self._raw[-1][1] = end
+                else:
+                    self._raw.append([end - self.frame, end])
+                    opened.append(max(0, end - self.frame - self.pre))
+        self.n += len(x)
+        return opened
+
+    def _phrases(self) -> list:
+        return [r for r in self._raw if r[1] - r[0] >= self.min_speech]
+
+    @property
+    def voiced_any(self) -> bool:
+        return bool(self._phrases())
+
+    @property
+    def pending_start(self):
+        """First voiced sample of the open phrase (confirmed or not), or None between phrases."""
+        return self._raw[-1][0] if self.in_speech else None
+
+    @property
+    def in_speech(self) -> bool:
+        """A phrase is open: voice was heard within the last SPLIT_GAP_SEC."""
+        return bool(self._raw) and self.n - self._raw[-1][1] < self.gap
+
+    def silence_tail(self) -> float:
+        """Seconds since the end of the last phrase (0 before any)."""
+        phrases = self._phrases()
+        return (self.n - phrases[-1][1]) / self.sr if phrases else 0.0
+
+    def endpoint(self, tail_sec: float) -> bool:
+        """A phrase has been heard and followed by at least tail_sec of silence."""
+        return self.voiced_any and self.silence_tail() >= tail_sec
+
+    def segments(self) -> list:
+        """(start, end) sample ranges of the phrases so far, with pre/post roll."""
+        return [(max(0, s - self.pre), min(self.n, e + self.post)) for s, e in self._phrases()]
+
+def speech_segments(audio16: np.ndarray, **kw) -> list:
+    """(start, end) sample ranges of the phrases in a 16 kHz clip."""
+    gate = VoiceGate(**kw)
+    gate.push(audio16)
+    return gate.segments()
+
+def trim_silence(audio16: np.ndarray, **kw) -> np.ndarray:
+    """The clip from its first phrase to the end of its last one (empty if nothing was said)."""
+    segs = speech_segments(audio16, **kw)
+    if not segs:
+        return audio16[:0]
+    return audio16[segs[0][0]:segs[-1][1]]
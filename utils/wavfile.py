@@ -0,0 +1,30 @@
+# utils/wavfile.py
+import wave
+import numpy as np
+
+from asr.resample import resample
+
+def read_wav(path: str, target_sr: int = 16000) -> np.ndarray:
+    """Read a PCM WAV file as mono float32 in [-1, 1], resampled to target_sr."""
+    with wave.open(path, "rb") as w:
+        sr, ch, width = w.getframerate(), w.getnchannels(), w.getsampwidth()
+        raw = w.readframes(w.getnframes())
+
+    if width == 1:
+        x = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif width == 2:
+        x = np.frombuffer(raw, dtype="<i2").astype(np.float32) / 32768.0
+    elif width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3).astype(np.int32)
+        v = b[:, 0] | (b[:, 1] << 8) | (b[:, 2] << 16)
+        x = (np.where(v & 0x800000, v - 0x1000000, v)).astype(np.float32) / 8388608.0
+    elif width == 4:
+        x = np.frombuffer(raw, dtype="<i4").astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"unsupported sample width {width} in {path}")
+
+    if ch > 1:
+        x = x.reshape(-1, ch).mean(axis=1)
+    if sr != target_sr and len(x):
+        x = resample(x, sr, target_sr)
+    return np.ascontiguousarray(x, dtype=np.float32)
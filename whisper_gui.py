@@ -5,39 +5,47 @@ os.environ["PYTORCH_MPS_HIGH_WATERMARK_RATIO"] = "0.0"
 os.environ["TORCH_COMPILE_DISABLE"] = "1"
 
 # stdlib
-import sys, threading, time, queue
+import itertools, sys, threading, time
 from datetime import datetime
 
 # third party
-import numpy as np
 import sounddevice as sd
-import torch
 from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QFont, QTextCursor
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QTextEdit,
     QComboBox, QLabel, QHBoxLayout, QProgressBar, QCheckBox
 )
-from transformers import WhisperProcessor, WhisperForConditionalGeneration
 from transformers.utils import logging as hf_logging
 hf_logging.set_verbosity_error()
 
 # local
 from ui.mic_button import MicHoldButton
-from asr.decoder import run_decode
+from asr.decoder import MAX_HOLD_SEC, run_decode
+from asr.precision import PRECISION, PRECISIONS
+from asr.backends import ENGINE
+from asr.registry import REGISTRY
 from utils.arabizi import (
     arabic_to_arabizi, has_arabic_chars, detect_lang,
     mentions_darija_word, normalize_mishears
 )
-from llm.tutor_client import ask_llm
+from llm.tutor_client import ask_llm, warm_up
+from llm.prefetch import Prefetcher
+from llm.router import warm_up as warm_up_router
 from llm.topics import extract_topics
+from utils.ring_buffer import AudioRing
 
 class PushToTalkWindow(QMainWindow):
     text_ready = Signal(str)
     break_line = Signal()
-    tutor_text = Signal(str)
+    tutor_text = Signal(int, str)   # (reply id, the reply so far), repainted as tokens stream in
+    tutor_done = Signal(int, str)   # (reply id, the final reply); closes that reply's line
     progress = Signal(int)
     finalize_sig = Signal(float)
+    endpoint_sig = Signal()  # VAD heard the end of the phrase (ASR_AUTO_RELEASE_SEC)
+    stable_sig = Signal(str)  # transcript so far at release, for the speculative tutor reply
+    backend_ready = Signal(str, object)
+    backend_failed = Signal(str)
 
     def __init__(self):
         super().__init__()
@@ -45,20 +53,23 @@ class PushToTalkWindow(QMainWindow):
         # runtime
         self.recording = False
         self.is_holding = False
-        self.inbuf = queue.Queue()
+        self.inbuf = None  # AudioRing filled by on_audio, drained by run_decode; reused across holds
+        self._inbuf_sr = None
+        self._inbuf_reader = None  # decoder thread that last drained inbuf
         self.fs = 16000
         self.worker = None
         self.live_text = ""
         self.seg_t0 = time.time()
         self._autoscroll = True
+        self._tutor_curs = {}  # reply id -> QTextCursor over that reply's line, while it streams
+        self._tutor_ids = itertools.count(1)
+        self._prefetch = Prefetcher()
         self.mic_sr = 16000
         self.stream = None
         self._active_mic = None
 
         # models
-        self.device = torch.device("cpu")
-        self.model = None
-        self.processor = None
+        self.backend = None  # asr.backends.ASRBackend, swapped in by _on_backend_ready
         self.lang_hint = "auto"  # always 'auto' with mixed Whisper
 
         # personalization topics (rolling window)
@@ -68,6 +79,8 @@ class PushToTalkWindow(QMainWindow):
         self._init_ui()
         self._connect_signals()
         self.load_backend()
+        threading.Thread(target=warm_up, daemon=True).start()  # tutor connection ready before the first reply
+        warm_up_router()  # small-talk classifier trained in the background before the first turn
 
     # ---------------- UI ----------------
     def _init_ui(self):
@@ -79,16 +92,28 @@ class PushToTalkWindow(QMainWindow):
         lbl = QLabel("Model:")
         lbl.setStyleSheet("color:#ccc;")
         self.model_combo = QComboBox()
-        self.model_combo.addItems(["Standard", "Advanced"])  # small / medium
+        self.model_combo.addItems(["Standard", "Advanced", "Advanced-fast"])  # small / medium / medium drafted by small
         self.model_combo.setCurrentText("Standard")
         self.model_combo.setFixedWidth(180)
         controls.addWidget(lbl)
         controls.addWidget(self.model_combo)
 
+        # Weight precision for the CPU model (bf16 / int8 are converted once and cached on disk)
+        self.precision_combo = QComboBox()
+        self.precision_combo.addItems(list(PRECISIONS))
+        self.precision_combo.setCurrentText(PRECISION if PRECISION in PRECISIONS else "fp32")
+        self.precision_combo.setFixedWidth(80)
+        controls.addWidget(self.precision_combo)
+
         # Arabizi display toggle (affects live TRANSCRIPT display only)
         self.cb_arabizi = QCheckBox("Arabizi")
         self.cb_arabizi.setChecked(True)
         controls.addWidget(self.cb_arabizi)
+
+        # Live decoding while the mic is held (commits stable words early)
+        self.cb_stream = QCheckBox("Live")
+        self.cb_stream.setChecked(True)
+        controls.addWidget(self.cb_stream)
         controls.addStretch(1)
         main_layout.addLayout(controls)
         main_layout.addSpacing(8)
@@ -147,9 +172,14 @@ class PushToTalkWindow(QMainWindow):
     def _connect_signals(self):
         self.text_ready.connect(self.paint_text)
         self.break_line.connect(self.insert_blank)
-        self.tutor_text.connect(self._append_tutor)
+        self.tutor_text.connect(self._update_tutor)
+        self.tutor_done.connect(self._finish_tutor)
         self.progress.connect(self._on_progress)
         self.finalize_sig.connect(self._finalize_live_segment)
+        self.endpoint_sig.connect(self.end_io)
+        self.stable_sig.connect(self._prefetch_reply)
+        self.backend_ready.connect(self._on_backend_ready)
+        self.backend_failed.connect(self.statusBar().showMessage)
 
         self.mic_en.pressed.connect(lambda: self.begin_io("en"))
         self.mic_en.released.connect(self.end_io)
@@ -157,17 +187,38 @@ class PushToTalkWindow(QMainWindow):
         self.mic_ar.released.connect(self.end_io)
 
         self.model_combo.currentTextChanged.connect(self.load_backend)
+        self.precision_combo.currentTextChanged.connect(self.load_backend)
 
     # ---------------- transcript painters ----------------
     def paint_text(self, text: str):
         self._update_display(text)
 
-    def _append_tutor(self, line: str):
-        cur = self.text_display.textCursor()
-        cur.movePosition(QTextCursor.End)
-        ts = datetime.now().strftime("%H:%M:%S")
-        cur.insertText(f"[{ts}] {line}\n")
-        self.text_display.moveCursor(QTextCursor.End)
+    def _update_tutor(self, reply_id: int, line: str):
+        # Each live tutor line is held by its own QTextCursor selection, which Qt keeps in
+        # place while the transcript (or another reply) grows around it; the trailing
+        # newline stays outside it.
+        cur = self._tutor_curs.get(reply_id)
+        if cur is None:
+            cur = self.text_display.textCursor()
+            cur.movePosition(QTextCursor.End)
+            ts = datetime.now().strftime("%H:%M:%S")
+            cur.insertText(f"[{ts}] \n")
+            cur.movePosition(QTextCursor.Left)
+            self._tutor_curs[reply_id] = cur
+        start, old_end = cur.selectionStart(), cur.selectionEnd()
+        cur.insertText(line)
+        end = cur.position()
+        cur.setPosition(start)
+        cur.setPosition(end, QTextCursor.KeepAnchor)
+        # the live transcript anchor is a plain offset; shift it if the reply above it changed size
+        if getattr(self, "live_anchor_pos", None) is not None and start < self.live_anchor_pos:
+            self.live_anchor_pos += end - old_end
+        if self._autoscroll:
+            self.text_display.moveCursor(QTextCursor.End)
+
+    def _finish_tutor(self, reply_id: int, line: str):
+        self._update_tutor(reply_id, line)
+        self._tutor_curs.pop(reply_id, None)
 
     def insert_blank(self):
         cur = self.text_display.textCursor()
@@ -198,56 +249,56 @@ class PushToTalkWindow(QMainWindow):
         self.prog.setValue(max(0, min(100, int(p))))
 
     # ---------------- Models ----------------
-    def load_backend(self):
-        was_recording = self.recording
-        if was_recording: self.end_io()
+    def _backend_label(self) -> str:
+        return f"{self.model_combo.currentText()} ({self.precision_combo.currentText()})"
 
+    def load_backend(self):
         NAME_MAP = {
             "Standard": "openai/whisper-small",
             "Advanced": "openai/whisper-medium",
+            # medium's transcript, with small proposing tokens that medium verifies in one pass
+            "Advanced-fast": "openai/whisper-medium+openai/whisper-small",
         }
         choice = self.model_combo.currentText() if hasattr(self, "model_combo") else "Standard"
         repo = NAME_MAP[choice].replace(" ", "").replace("\u00A0","").replace("\u200B","").strip()
-        print("HF repo =", repr(repo))
+        precision = self.precision_combo.currentText()
+        label = self._backend_label()
+        print("HF repo =", repr(repo), precision)
         self.lang_hint = "auto"
 
-        self.statusBar().showMessage(f"Loading {choice} from {repo} on cpu...")
-        QApplication.processEvents()
+        # Recently used checkpoints come straight from the registry; anything else loads
+        # on the registry's thread and is swapped in by _on_backend_ready. A recording in
+        # progress keeps the model it started with.
+        cached = REGISTRY.get(repo, precision)
+        if cached is not None:
+            self._on_backend_ready(label, cached)
+            return
 
-        self.processor = WhisperProcessor.from_pretrained(repo)
-        self.model = WhisperForConditionalGeneration.from_pretrained(
-            repo, torch_dtype=torch.float32
-        ).to(torch.device("cpu"))
-        self.device = torch.device("cpu")
-
-        # silence HF warning about do_sample/temperature
-        try:
-            gc = self.model.generation_config
-            if hasattr(gc, "temperature"):
-                gc.temperature = None
-            if hasattr(gc, "do_sample"):
-                gc.do_sample = False
-        except Exception:
-            pass
-
-        try:
-            if getattr(self.model.generation_config, "forced_decoder_ids", None) is not None:
-                self.model.generation_config.forced_decoder_ids = None
-        except Exception: pass
-        try:
-            self.model.generation_config.use_cache = False
-        except Exception: pass
-
-        self.statusBar().showMessage(f"Loaded: {choice} on cpu")
-        if was_recording: self.begin_io("en")
+        self.statusBar().showMessage(f"Loading {label} from {repo} on cpu ({ENGINE or 'transformers'})...")
+        def _done(fut):
+            try:
+                self.backend_ready.emit(label, fut.result())
+            except Exception as e:
+                self.backend_failed.emit(f"Failed to load {label}: {e}")
+        REGISTRY.load_async(repo, precision, _done)
+
+    def _on_backend_ready(self, label: str, backend):
+        if label != self._backend_label():
+            return  # user moved on while this was loading; it stays warm in the registry
+        # swapped on the GUI thread, so begin_io always hands the worker one complete backend
+        self.backend = backend
+        if not self.recording:
+            self.statusBar().showMessage(f"Loaded: {label} on cpu")
 
     # ---------------- IO ----------------
     def begin_io(self, forced_input_lang: str | None = None):
         self.active_input_lang = (forced_input_lang or self.lang_hint or "auto").lower()
         self.lang_hint = self.active_input_lang  # hint for this segment only
 
-        if self.model is None or self.processor is None: self.load_backend()
         if self.recording: return
+        if self.backend is None:
+            self.statusBar().showMessage("model still loading...")
+            return
 
         self.recording = True
         self.is_holding = True
@@ -257,27 +308,33 @@ class PushToTalkWindow(QMainWindow):
         sd.default.dtype = ("float32", "float32")
         sd.default.channels = 1
         self.stream = sd.InputStream(channels=1, dtype="float32", callback=self.on_audio)
-        self.stream.start()
         self.mic_sr = int(self.stream.samplerate)
+        self.inbuf = self._mic_ring(self.mic_sr)
+        self.stream.start()
 
         self.prog.setVisible(True); self.prog.setValue(0)
 
         self._active_mic = self.mic_ar if self.active_input_lang == "ar" else self.mic_en
         self._active_mic.start_hold()
 
-        def _emit_cb(t: str):
-            # Show live transcript (Darija → optionally Arabizi for display only)
+        def _display(t: str) -> str:
+            # Darija → optionally Arabizi for display only
             if self.active_input_lang == "ar" and self.cb_arabizi.isChecked():
                 t = arabic_to_arabizi(t)
-            self.text_ready.emit(t)
+            return t
+
+        def _emit_cb(t: str):
+            self.text_ready.emit(_display(t))
 
         self.worker = threading.Thread(
             target=run_decode,
-            args=(self, self.fs, self.processor, self.model, self.inbuf,
-                  _emit_cb, self.finalize_sig.emit, self.device, self.progress.emit,
-                  self.active_input_lang),
+            args=(self, self.fs, self.backend, self.inbuf,
+                  _emit_cb, self.finalize_sig.emit, self.progress.emit,
+                  self.active_input_lang, self.cb_stream.isChecked(), self.endpoint_sig.emit,
+                  lambda t: self.stable_sig.emit(_display(t))),
             daemon=True
         )
+        self._inbuf_reader = self.worker
         self.worker.start()
         self.statusBar().showMessage("recording...")
 
@@ -299,18 +356,47 @@ class PushToTalkWindow(QMainWindow):
         self.worker = None
         self.statusBar().showMessage("processing...")
 
+    def _mic_ring(self, sr: int) -> AudioRing:
+        # one MAX_HOLD_SEC ring per mic rate, emptied per hold rather than reallocated
+        # (~11.5 MB at 48 kHz); a decoder that outlived end_io's join keeps the old one
+        late = self._inbuf_reader is not None and self._inbuf_reader.is_alive()
+        if self.inbuf is None or self._inbuf_sr != sr or late:
+            self.inbuf, self._inbuf_sr = AudioRing.for_duration(MAX_HOLD_SEC, sr), sr
+        else:
+            self.inbuf.clear()
+        return self.inbuf
+
     def on_audio(self, indata, frames, time_info, status):
         if status: print(status)
-        self.inbuf.put(indata.copy())
+        mono = indata[:, 0]
+        self.inbuf.write(mono)
         try:
             if self._active_mic is not None:
-                self._active_mic.update_audio(indata.astype(np.float32).flatten())
+                self._active_mic.update_audio(mono)
         except Exception:
             pass
 
     # ---------------- finalize + LLM ----------------
+    def _route_args(self, text: str):
+        lang_in = getattr(self, "active_input_lang", None) or detect_lang(text)
+        want_script = "arabic" if has_arabic_chars(text) else "arabizi"
+        return lang_in, want_script
+
+    def _prefetch_reply(self, text: str):
+        text = text.strip()
+        if not text:
+            return
+        lang_in, want_script = self._route_args(text)
+        try:
+            topics = extract_topics(text, getattr(self, "_topics", []))
+        except Exception:
+            topics = getattr(self, "_topics", [])
+        self._prefetch.start(text, lang_in, want_script, tuple(topics or ()))
+
     def _finalize_live_segment(self, end_time=None):
-        if getattr(self, "live_anchor_pos", None) is None: return ""
+        if getattr(self, "live_anchor_pos", None) is None:
+            self._prefetch.cancel()  # nothing was transcribed: no one will claim the speculative reply
+            return ""
         doc = self.text_display.document()
         cur = self.text_display.textCursor()
         cur.setPosition(self.live_anchor_pos)
@@ -337,22 +423,33 @@ class PushToTalkWindow(QMainWindow):
         # Route + Topics + LLM
         text = live_text.strip()
         if text:
-            lang_in = getattr(self, "active_input_lang", None) or detect_lang(text)
-            want_script = "arabic" if has_arabic_chars(live_text) else "arabizi"
+            lang_in, want_script = self._route_args(text)
             try:
                 self._topics = extract_topics(text, getattr(self, "_topics", []))
             except Exception:
                 pass
+            # a reply started on the partial transcript carries on if the final text agrees with it
+            job = self._prefetch.claim(text, lang_in, want_script)
+            reply_id = next(self._tutor_ids)
             def _router_worker():
+                pieces = []
+                def _on_token(piece: str):
+                    pieces.append(piece)
+                    self.tutor_text.emit(reply_id, f"[Tutor] {''.join(pieces)}")
                 try:
-                    from llm.router import route
-                    topics_tuple = tuple(getattr(self, "_topics", []) or [])
-                    reply = route(text, lang_in, want_script, topics=topics_tuple)
+                    if job is not None:
+                        reply = job.attach(_on_token)
+                    else:
+                        from llm.router import route
+                        topics_tuple = tuple(getattr(self, "_topics", []) or [])
+                        reply = route(text, lang_in, want_script, topics=topics_tuple, on_token=_on_token)
                 except Exception as e:
                     reply = f"(LLM error: {e})"
-                self.tutor_text.emit(f"[Tutor] {reply}")
+                self.tutor_done.emit(reply_id, f"[Tutor] {reply}")
                 self.statusBar().showMessage("idle")
             threading.Thread(target=_router_worker, daemon=True).start()
+        else:
+            self._prefetch.cancel()
 
         self.statusBar().showMessage("idle")
         self.prog.setValue(100); self.prog.setVisible(False)